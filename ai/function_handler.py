@@ -2,18 +2,117 @@
 AI function handler for integrating OpenAI with MCP tools.
 """
 import asyncio
+import inspect
 import json
+import logging
 import time
-from typing import Dict, List, Optional, Any, AsyncGenerator, Tuple
-from dataclasses import dataclass, field
+import uuid
+from collections import deque
+from itertools import islice
+from typing import Deque, Dict, Iterator, List, Optional, Any, AsyncGenerator, Callable, Tuple
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 
+import numpy as np
+
 from ai.openai_client import OpenAIClient, ChatMessage
+from config.settings import settings
 from mcp_client.tool_executor import MCPToolExecutor, ToolExecution
+from utils.helpers import json_dumps, json_loads
 from utils.logger import logger
 
 
-@dataclass 
+# Kept byte-identical across turns so providers can cache the prompt prefix.
+# Dynamic context (such as the current time) is appended later in the history.
+_SYSTEM_PROMPT_STATIC = """You are a helpful AI assistant with access to various tools through MCP (Model Context Protocol) servers. 
+
+When a user asks you to perform tasks, you can:
+1. Use available tools to accomplish the task
+2. Execute multiple tools in sequence if needed
+3. Provide detailed explanations of what you're doing
+4. Handle errors gracefully and explain what went wrong
+
+Available tools will be provided dynamically based on connected MCP servers. Each tool description includes the server name in brackets [server_name].
+
+If you are saving a file, ensure you save it at the file path "workspace/FILE_NAME.EXTENSION"
+
+Always be helpful, accurate, and explain your actions clearly to the user.
+
+If the user asks about an event which has happened outside of your context window, then you should use the search tool to research about the event/topic."""
+
+_SUMMARY_PROMPT = (
+    "Summarize the following conversation in at most 400 tokens. "
+    "Preserve user goals, decisions made, file paths, and key tool results."
+)
+
+_SUMMARY_PREFIX = "[Summary of earlier turns]: "
+
+# Tool arguments larger than this are parsed off the event loop
+_LARGE_ARGUMENTS_BYTES = 64 * 1024
+
+# Streamed content is regrouped into batches flushed on whichever limit is hit first
+_STREAM_FLUSH_INTERVAL = 0.02  # seconds
+_STREAM_FLUSH_CHARS = 256  # roughly 64 tokens
+
+
+async def _batched_stream(
+    stream: AsyncGenerator[Tuple[bool, str, Optional[List[Dict]], Optional[str]], None],
+    max_interval: float = _STREAM_FLUSH_INTERVAL,
+    max_chars: int = _STREAM_FLUSH_CHARS
+) -> AsyncGenerator[Tuple[bool, str, Optional[List[Dict]], Optional[str]], None]:
+    """Merge consecutive content chunks from a chat stream; other items pass straight through."""
+    loop = asyncio.get_running_loop()
+    iterator = stream.__aiter__()
+    buffer: List[str] = []
+    buffered_chars = 0
+    deadline = None
+    pending = None
+    
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            
+            # Only wait with a timeout while content is buffered
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            
+            if not done:
+                yield True, "".join(buffer), None, None
+                buffer, buffered_chars, deadline = [], 0, None
+                continue
+            
+            task, pending = pending, None
+            try:
+                item = task.result()
+            except StopAsyncIteration:
+                break
+            
+            success, chunk, tool_calls, _ = item
+            if success and chunk and not tool_calls:
+                buffer.append(chunk)
+                buffered_chars += len(chunk)
+                if deadline is None:
+                    deadline = loop.time() + max_interval
+                if buffered_chars >= max_chars:
+                    yield True, "".join(buffer), None, None
+                    buffer, buffered_chars, deadline = [], 0, None
+                continue
+            
+            # Tool calls, errors and end markers flush pending content first
+            if buffer:
+                yield True, "".join(buffer), None, None
+                buffer, buffered_chars, deadline = [], 0, None
+            yield item
+        
+        if buffer:
+            yield True, "".join(buffer), None, None
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+@dataclass(slots=True)
 class ConversationTurn:
     """Represents a complete conversation turn with tool executions."""
     user_message: str
@@ -24,7 +123,7 @@ class ConversationTurn:
     total_time: Optional[float] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class AIStatus:
     """Represents the current status of AI processing."""
     state: str  # "idle", "thinking", "executing_tool", "responding"
@@ -39,11 +138,14 @@ class AIStatus:
 class FunctionHandler:
     """Handles OpenAI function calling integration with MCP tools."""
     
-    def __init__(self, openai_client: OpenAIClient, tool_executor: MCPToolExecutor):
+    def __init__(self, openai_client: OpenAIClient, tool_executor: MCPToolExecutor, parallel_tools: bool = True):
         self.openai_client = openai_client
         self.tool_executor = tool_executor
-        self.conversation_history: List[ChatMessage] = []
+        self.parallel_tools = parallel_tools  # Run tool calls from one response concurrently
+        self.conversation_history: Deque[ChatMessage] = deque()
         self.conversation_turns: List[ConversationTurn] = []
+        self._summary = self._empty_summary()
+        self._turn_export_lines: List[str] = []  # Serialized JSONL line per turn; turns never change once recorded
         
         # Real-time status tracking
         self.current_status: AIStatus = AIStatus(
@@ -51,61 +153,186 @@ class FunctionHandler:
             current_activity="Ready to chat",
             start_time=time.time()
         )
-        self.status_history: List[AIStatus] = []
+        self.status_history: Deque[AIStatus] = deque(maxlen=200)
+        self._tools_completed = 0
+        self._tool_semaphore = asyncio.Semaphore(settings.max_concurrent_tools)  # Bounds parallel tool fan-out
         
-        # Caching for efficiency
-        self._cached_functions = None
-        self._functions_cache_time = 0
-        self._cache_duration = 30  # Cache functions for 30 seconds
         self._request_lock = asyncio.Lock()
         
-        # System message for MCP tool usage (static timestamp to enable caching)
+        # System message for MCP tool usage (static content to enable prompt caching)
         self.system_message = self._create_system_message()
         self.conversation_history.append(self.system_message)
+        self._last_time_context: Optional[str] = None
+        self._history_token_estimate = self.openai_client.count_tokens(self.system_message)
+        
+        # Semantic response cache: one unit-norm embedding per row, searched with a single matrix product
+        self._cache_matrix: Optional[np.ndarray] = None  # Allocated on first insert, once the dimension is known
+        self._cache_turns: List[ConversationTurn] = []
+        self._cache_last_used = np.zeros(settings.semantic_cache_size, dtype=np.int64)
+        self._cache_tick = 0
+        
+        # Keeps every request of this conversation on the same provider prompt cache
+        self._prompt_cache_key = uuid.uuid4().hex
     
     def _create_system_message(self) -> ChatMessage:
         """Create the system message that explains MCP tool usage."""
-        # Use static content to enable better caching (no dynamic timestamp)
-        content = """You are a helpful AI assistant with access to various tools through MCP (Model Context Protocol) servers. 
-
-When a user asks you to perform tasks, you can:
-1. Use available tools to accomplish the task
-2. Execute multiple tools in sequence if needed
-3. Provide detailed explanations of what you're doing
-4. Handle errors gracefully and explain what went wrong
-
-Available tools will be provided dynamically based on connected MCP servers. Each tool description includes the server name in brackets [server_name].
-
-If you are saving a file, ensure you save it at the file path "workspace/FILE_NAME.EXTENSION"
-
-Always be helpful, accurate, and explain your actions clearly to the user.
-
-If the user asks about an event which has happened outside of your context window, then you should use the search tool to research about the event/topic."""
+        # Provider-side prompt caching can only be requested explicitly on some backends
+        cache_control = {"type": "ephemeral"} if settings.prompt_cache_control else None
+        return self.openai_client.create_system_message(_SYSTEM_PROMPT_STATIC, cache_control=cache_control)
+    
+    def _append_history(self, message: ChatMessage) -> None:
+        """Append a message to the conversation history and track its estimated size."""
+        self.conversation_history.append(message)
+        self._history_token_estimate += self.openai_client.count_tokens(message)
+    
+    def _rollback_history(self, length: int, token_estimate: int, last_time_context: Optional[str]) -> None:
+        """Drop messages appended after a snapshot, restoring the history to that point."""
+        history = self.conversation_history
+        while len(history) > length:
+            history.pop()
+        self._history_token_estimate = token_estimate
+        self._last_time_context = last_time_context
+    
+    async def _summarize_history_if_needed(self) -> None:
+        """Replace the oldest turns with a short summary once the history grows too large."""
+        threshold = settings.history_summary_threshold
+        if self._history_token_estimate <= threshold:
+            return
+        
+        # Keep recent whole turns (up to half the budget) and always the latest one;
+        # cutting only at user messages never separates tool calls from their results
+        history = self.conversation_history
+        cut = None
+        tail_tokens = 0
+        for index, message in zip(range(len(history) - 1, 0, -1), reversed(history)):
+            tail_tokens += self.openai_client.count_tokens(message)
+            if message.role == "user":
+                if cut is not None and tail_tokens > threshold // 2:
+                    break
+                cut = index
+        
+        # Keep the time context that introduces the first kept turn
+        if cut is not None and cut > 1 and history[cut - 1].content == self._last_time_context:
+            cut -= 1
+        
+        # Index 0 is the static system prompt and must stay first for prompt caching
+        if cut is None or cut <= 1:
+            return
         
-        return self.openai_client.create_system_message(content)
+        old_messages = list(islice(history, 1, cut))
+        transcript = "\n\n".join(
+            f"{message.role}: {(message.content or '')[:2000]}"
+            for message in old_messages
+            if message.content
+        )
+        
+        self._update_status("thinking", "Summarizing earlier conversation...")
+        success, summary, _, error = await self.openai_client.chat_completion(
+            messages=[
+                self.openai_client.create_system_message(_SUMMARY_PROMPT),
+                self.openai_client.create_user_message(transcript)
+            ],
+            model=settings.openai_summary_model
+        )
+        
+        if not success or not summary:
+            logger.warning(f"History summarization failed, keeping full history: {error}")
+            return
+        
+        # Swap the summarized messages for the summary, keeping the system prompt first
+        summary_message = self.openai_client.create_system_message(_SUMMARY_PREFIX + summary)
+        system_message = history.popleft()
+        for message in old_messages:
+            history.popleft()
+            self._history_token_estimate -= self.openai_client.count_tokens(message)
+        history.appendleft(summary_message)
+        history.appendleft(system_message)
+        self._history_token_estimate += self.openai_client.count_tokens(summary_message)
+        
+        # Re-add the time context next turn if it was summarized away
+        if not any(message.content == self._last_time_context for message in islice(history, 2, None)):
+            self._last_time_context = None
+        logger.info(f"Summarized {len(old_messages)} older messages into one summary message")
+    
+    def _append_time_context(self) -> None:
+        """Append the current time (rounded to the minute) just before the next user turn."""
+        time_context = f"Current time: {datetime.now():%Y-%m-%d %H:%M}"
+        
+        # Only add a new message when the minute has changed since the last one
+        if time_context != self._last_time_context:
+            self._append_history(self.openai_client.create_system_message(time_context))
+            self._last_time_context = time_context
+    
+    def _cache_key_text(self, user_input: str) -> str:
+        """Build the text embedded for the response cache (previous answer tail + user input)."""
+        # Short follow-ups ("yes, do it") only mean the same thing after the same answer
+        previous = self.conversation_turns[-1].assistant_response[-500:] if self.conversation_turns else ""
+        return f"{previous}\n{user_input.strip().lower()}"
+    
+    async def _embed_for_cache(self, user_input: str) -> Optional[np.ndarray]:
+        """Embed the cache key for a user input, or None if the cache is off or embedding fails."""
+        if not settings.semantic_cache_enabled:
+            return None
+        
+        success, embedding, _ = await self.openai_client.create_embedding(self._cache_key_text(user_input))
+        if not success:
+            return None
+        
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
     
-    def _get_cached_functions(self) -> List[Dict]:
-        """Get cached function definitions or refresh if stale."""
-        current_time = time.time()
+    def _lookup_cached_turn(self, embedding: Optional[np.ndarray]) -> Optional[ConversationTurn]:
+        """Return the cached turn most similar to the embedding if it clears the threshold."""
+        if embedding is None or not self._cache_turns or embedding.shape[0] != self._cache_matrix.shape[1]:
+            return None
         
-        # Check if cache is still valid
-        if (self._cached_functions is not None and 
-            current_time - self._functions_cache_time < self._cache_duration):
-            return self._cached_functions
+        # Rows are unit-norm, so the dot products are cosine similarities
+        similarities = self._cache_matrix[:len(self._cache_turns)] @ embedding
+        best_index = int(similarities.argmax())
+        best_score = float(similarities[best_index])
         
-        # Refresh cache
-        self._cached_functions = self.tool_executor.get_openai_function_definitions()
-        self._functions_cache_time = current_time
-        logger.debug(f"Refreshed function cache with {len(self._cached_functions)} functions")
+        if best_score < settings.semantic_cache_threshold:
+            return None
         
-        return self._cached_functions
+        self._cache_tick += 1
+        self._cache_last_used[best_index] = self._cache_tick
+        logger.info(f"Semantic cache hit (similarity {best_score:.3f})")
+        return self._cache_turns[best_index]
+    
+    def _store_cached_turn(self, embedding: Optional[np.ndarray], turn: ConversationTurn) -> None:
+        """Cache a turn's answer; turns with tool executions are never cached."""
+        if embedding is None or turn.tool_executions:
+            return
+        
+        capacity = settings.semantic_cache_size
+        if capacity <= 0:
+            return
+        
+        # (Re)allocate when first used or when the embedding model changed dimension
+        if self._cache_matrix is None or self._cache_matrix.shape[1] != embedding.shape[0]:
+            self._cache_matrix = np.empty((capacity, embedding.shape[0]), dtype=np.float32)
+            self._cache_turns = []
+        
+        # Fill free rows first, then overwrite the least recently used one
+        if len(self._cache_turns) < capacity:
+            row = len(self._cache_turns)
+            self._cache_turns.append(turn)
+        else:
+            row = int(self._cache_last_used.argmin())
+            self._cache_turns[row] = turn
+        
+        self._cache_matrix[row] = embedding
+        self._cache_tick += 1
+        self._cache_last_used[row] = self._cache_tick
     
     def _update_status(self, state: str, activity: str, current_tool: Optional[str] = None, 
                       tool_progress: Optional[str] = None, tools_completed: int = 0, total_tools: int = 0):
         """Update the current AI status."""
-        # Archive current status
-        if hasattr(self, 'current_status'):
-            self.status_history.append(self.current_status)
+        # Archive only on transitions; repeated updates for the same state and tool overwrite in place
+        current = self.current_status
+        if current.state != state or current.current_tool != current_tool:
+            self.status_history.append(current)
         
         # Create new status
         self.current_status = AIStatus(
@@ -118,20 +345,28 @@ If the user asks about an event which has happened outside of your context windo
             total_tools=total_tools
         )
         
-        logger.info(f"AI Status: {state} - {activity}")
+        # Only state transitions are worth an INFO line; lazy formatting skips work when filtered out
+        level = logging.INFO if current.state != state else logging.DEBUG
+        logger.log(level, "AI Status: %s - %s", state, activity)
     
     def get_current_status(self) -> AIStatus:
         """Get the current AI status."""
         return self.current_status
     
     def get_status_history(self) -> List[AIStatus]:
-        """Get the status history."""
-        return self.status_history
+        """Get the status history (most recent last)."""
+        return list(self.status_history)
+    
+    def get_recent_statuses(self, n: int = 5) -> List[AIStatus]:
+        """Get the last n status updates (most recent last)."""
+        # Copy before slicing: the loop thread may append while a lazy iterator is walking the deque
+        return list(self.status_history)[-n:] if n > 0 else []
     
     async def handle_user_message(
         self, 
         user_input: str, 
-        stream: bool = False
+        stream: bool = False,
+        on_token: Optional[Callable[[str], Any]] = None
     ) -> ConversationTurn:
         """
         Handle a user message, potentially making tool calls.
@@ -139,6 +374,7 @@ If the user asks about an event which has happened outside of your context windo
         Args:
             user_input: The user's message
             stream: Whether to use streaming responses
+            on_token: Optional callback (sync or async) called with each streamed content chunk
             
         Returns:
             ConversationTurn with the complete interaction
@@ -151,40 +387,68 @@ If the user asks about an event which has happened outside of your context windo
             # Update status - starting to process
             self._update_status("thinking", "Processing your request...")
             
-            # Add user message to conversation
+            # Serve near-duplicate questions from the semantic cache
+            cache_embedding = await self._embed_for_cache(user_input)
+            cached_turn = self._lookup_cached_turn(cache_embedding)
+            
+            # Keep the resent history bounded before adding this turn
+            await self._summarize_history_if_needed()
+            
+            # Snapshot so a cancelled turn can be rolled back without leaving half a tool exchange
+            rollback = (len(self.conversation_history), self._history_token_estimate, self._last_time_context)
+            
+            # Add time context after the cached prefix, then the user message
+            self._append_time_context()
             user_message = self.openai_client.create_user_message(user_input)
-            self.conversation_history.append(user_message)
+            self._append_history(user_message)
+            
+            if cached_turn is not None:
+                self._append_history(
+                    self.openai_client.create_assistant_message(cached_turn.assistant_response)
+                )
+                elapsed = time.time() - start_time
+                turn = replace(
+                    cached_turn,
+                    user_message=user_input,
+                    tool_executions=[],
+                    timestamp=time.time(),
+                    thinking_time=elapsed,
+                    total_time=elapsed
+                )
+                self._update_status("idle", "Ready for next message")
+                self._record_turn(turn)
+                return turn
             
             tool_executions = []
             max_iterations = 5  # Prevent infinite loops
             iteration = 0
             
             try:
+                # The tool set doesn't change within a turn (definitions are memoized by the executor)
+                functions = self.tool_executor.get_openai_function_definitions()
+                
+                # Streaming only pays off when someone consumes the tokens as they arrive
+                stream = stream and on_token is not None
+                
                 while iteration < max_iterations:
                     iteration += 1
                     
-                    # Update status - thinking
-                    self._update_status("thinking", f"Analyzing request (iteration {iteration})")
-                    
-                    # Get available functions (cached)
-                    functions = self._get_cached_functions()
-                    
-                    # Update status - getting AI response
-                    self._update_status("thinking", "Getting AI response...")
-                    self._update_status("thinking", "Receiving streaming response...")
+                    # The first request is already covered by the "Processing your request" status
+                    if iteration > 1:
+                        self._update_status("thinking", f"Analyzing tool results (iteration {iteration})")
                     
                     # Get response from OpenAI
                     if stream:
                         # Handle streaming response
-                        assistant_response, new_tool_executions = await self._handle_streaming_response(functions)
+                        assistant_response, new_tool_executions, is_terminal = await self._handle_streaming_response(functions, on_token)
                     else:
                         # Handle non-streaming response  
-                        assistant_response, new_tool_executions = await self._handle_non_streaming_response(functions)
+                        assistant_response, new_tool_executions, is_terminal = await self._handle_non_streaming_response(functions)
                 
-                    tool_executions.extend(new_tool_executions)
+                    tool_executions += new_tool_executions
                     
                     # If no tool calls were made, we're done
-                    if not new_tool_executions:
+                    if is_terminal:
                         break
                 
                 # Update status - completing
@@ -204,9 +468,15 @@ If the user asks about an event which has happened outside of your context windo
                 # Update status - completed
                 self._update_status("idle", "Ready for next message")
                 
-                self.conversation_turns.append(turn)
+                self._store_cached_turn(cache_embedding, turn)
+                self._record_turn(turn)
                 return turn
                 
+            except asyncio.CancelledError:
+                self._rollback_history(*rollback)
+                self._update_status("idle", "Request cancelled")
+                raise
+                
             except Exception as e:
                 error_msg = f"Error handling user message: {str(e)}"
                 logger.error(error_msg)
@@ -222,17 +492,22 @@ If the user asks about an event which has happened outside of your context windo
                     thinking_time=time.time() - start_time
                 )
                 
-                self.conversation_turns.append(turn)
+                self._record_turn(turn)
                 return turn
     
     async def _handle_non_streaming_response(
         self, 
         functions: List[Dict]
-    ) -> Tuple[str, List[ToolExecution]]:
-        """Handle non-streaming response from OpenAI."""
+    ) -> Tuple[str, List[ToolExecution], bool]:
+        """Handle non-streaming response from OpenAI.
+        
+        Returns:
+            (content, tool_executions, is_terminal) where is_terminal means no tools were requested
+        """
         success, content, tool_calls, error = await self.openai_client.chat_completion(
             messages=self.conversation_history,
-            functions=functions
+            functions=functions,
+            cache_key=self._prompt_cache_key
         )
         
         if not success:
@@ -242,7 +517,7 @@ If the user asks about an event which has happened outside of your context windo
         
         # Create assistant message
         assistant_message = self.openai_client.create_assistant_message(content, tool_calls)
-        self.conversation_history.append(assistant_message)
+        self._append_history(assistant_message)
         
         # Execute tool calls if any
         if tool_calls:
@@ -260,47 +535,38 @@ If the user asks about an event which has happened outside of your context windo
                 total_tools=total_tools
             )
             
-            for i, tool_call in enumerate(tool_calls):
-                # Update status for tool execution
-                self._update_status(
-                    "executing_tool", 
-                    f"Executing tool {i+1} of {total_tools}",
-                    current_tool=tool_call["function"]["name"],
-                    tools_completed=i,
-                    total_tools=total_tools
-                )
-                
-                execution = await self._execute_tool_call(tool_call)
-                tool_executions.append(execution)
-                
-                # Add tool response to conversation
-                tool_response = self.openai_client.create_tool_message(
-                    content=self._format_tool_response(execution),
-                    tool_call_id=tool_call["id"],
-                    name=tool_call["function"]["name"]
-                )
-                self.conversation_history.append(tool_response)
+            tool_executions = await self._execute_tool_calls(tool_calls)
         
-        return content, tool_executions
+        return content, tool_executions, not tool_calls
     
     async def _handle_streaming_response(
         self, 
-        functions: List[Dict]
-    ) -> Tuple[str, List[ToolExecution]]:
-        """Handle streaming response from OpenAI."""
+        functions: List[Dict],
+        on_token: Optional[Callable[[str], Any]] = None
+    ) -> Tuple[str, List[ToolExecution], bool]:
+        """Handle streaming response from OpenAI, forwarding content chunks as they arrive.
+        
+        Returns:
+            (content, tool_executions, is_terminal) where is_terminal means no tools were requested
+        """
         content_parts = []
         tool_calls = None
         
         self._update_status("thinking", "Receiving streaming response...")
         
-        async for success, chunk, chunk_tool_calls, error in self.openai_client.chat_completion_stream(
+        async for success, chunk, chunk_tool_calls, error in _batched_stream(self.openai_client.chat_completion_stream(
             messages=self.conversation_history,
-            functions=functions
-        ):
+            functions=functions,
+            cache_key=self._prompt_cache_key
+        )):
             if not success:
                 raise Exception(f"OpenAI streaming error: {error}")
             
             if chunk:
+                if on_token is not None:
+                    result = on_token(chunk)
+                    if inspect.isawaitable(result):
+                        await result
                 content_parts.append(chunk)
             
             if chunk_tool_calls:
@@ -311,7 +577,7 @@ If the user asks about an event which has happened outside of your context windo
         
         # Create assistant message
         assistant_message = self.openai_client.create_assistant_message(content, tool_calls)
-        self.conversation_history.append(assistant_message)
+        self._append_history(assistant_message)
         
         # Execute tool calls if any
         if tool_calls:
@@ -329,28 +595,62 @@ If the user asks about an event which has happened outside of your context windo
                 total_tools=total_tools
             )
             
-            for i, tool_call in enumerate(tool_calls):
-                # Update status for tool execution
-                self._update_status(
-                    "executing_tool", 
-                    f"Executing tool {i+1} of {total_tools}",
-                    current_tool=tool_call["function"]["name"],
-                    tools_completed=i,
-                    total_tools=total_tools
-                )
-                
-                execution = await self._execute_tool_call(tool_call)
-                tool_executions.append(execution)
-                
-                # Add tool response to conversation
-                tool_response = self.openai_client.create_tool_message(
-                    content=self._format_tool_response(execution),
-                    tool_call_id=tool_call["id"],
-                    name=tool_call["function"]["name"]
+            tool_executions = await self._execute_tool_calls(tool_calls)
+        
+        return content, tool_executions, not tool_calls
+    
+    async def _execute_tool_calls(self, tool_calls: List[Dict]) -> List[ToolExecution]:
+        """Execute the tool calls from one assistant message and add their responses to the conversation."""
+        total_tools = len(tool_calls)
+        self._tools_completed = 0
+        
+        if self.parallel_tools and total_tools > 1:
+            # Independent calls run concurrently, so the turn waits for the slowest tool only
+            results = await asyncio.gather(
+                *(self._run_tool_call(tool_call, total_tools) for tool_call in tool_calls),
+                return_exceptions=True
+            )
+        else:
+            results = [await self._run_tool_call(tool_call, total_tools) for tool_call in tool_calls]
+        
+        tool_executions = []
+        
+        # Tool responses must be appended in the same order as the tool calls
+        for tool_call, execution in zip(tool_calls, results):
+            if isinstance(execution, BaseException):
+                execution = ToolExecution(
+                    tool_name=tool_call["function"]["name"],
+                    server_name="unknown",
+                    arguments={},
+                    success=False,
+                    error=str(execution)
                 )
-                self.conversation_history.append(tool_response)
+            tool_executions.append(execution)
+            
+            tool_response = self.openai_client.create_tool_message(
+                content=self._format_tool_response(execution),
+                tool_call_id=tool_call["id"],
+                name=tool_call["function"]["name"]
+            )
+            self._append_history(tool_response)
         
-        return content, tool_executions
+        return tool_executions
+    
+    async def _run_tool_call(self, tool_call: Dict, total_tools: int) -> ToolExecution:
+        """Execute a single tool call and record overall progress once it finishes."""
+        execution = await self._execute_tool_call(tool_call)
+        
+        # No await between read and write, so this is safe across concurrent calls
+        self._tools_completed += 1
+        self._update_status(
+            "executing_tool", 
+            f"Completed {self._tools_completed} of {total_tools} tool(s)",
+            current_tool=tool_call["function"]["name"],
+            tools_completed=self._tools_completed,
+            total_tools=total_tools
+        )
+        
+        return execution
     
     async def _execute_tool_call(self, tool_call: Dict) -> ToolExecution:
         """Execute a single tool call."""
@@ -369,13 +669,17 @@ If the user asks about an event which has happened outside of your context windo
         
         try:
             # Parse arguments
-            if isinstance(function_args, str):
-                arguments = json.loads(function_args)
+            if isinstance(function_args, (str, bytes)):
+                # Large payloads are parsed in a worker thread so other tool calls and streams keep running
+                if len(function_args) > _LARGE_ARGUMENTS_BYTES:
+                    arguments = await asyncio.to_thread(json_loads, function_args)
+                else:
+                    arguments = json_loads(function_args)
             else:
                 arguments = function_args
             
             # Log the tool request details
-            logger.info(f"📋 Tool Arguments: {json.dumps(arguments, indent=2)}")
+            logger.info("📋 Tool Arguments: %s", json_dumps(arguments))
             
             # Update progress
             self._update_status(
@@ -387,7 +691,8 @@ If the user asks about an event which has happened outside of your context windo
             
             # Execute the tool
             logger.info(f"⚡ Calling MCP tool: {function_name}")
-            execution = await self.tool_executor.execute_tool_by_name(function_name, arguments)
+            async with self._tool_semaphore:
+                execution = await self.tool_executor.execute_tool_by_name(function_name, arguments)
             
             # Update completion status with detailed logging
             if execution.success:
@@ -449,56 +754,74 @@ If the user asks about an event which has happened outside of your context windo
         """Format tool execution result for OpenAI."""
         if execution.success:
             if execution.result:
-                return json.dumps(execution.result, indent=2)
+                # Compact JSON keeps tool responses cheap to resend on every iteration
+                content = json_dumps(execution.result)
+                limit = settings.tool_response_max_chars
+                if len(content) > limit:
+                    # Only the model's copy is cut; the UI shows the full result from the execution record
+                    content = content[:limit] + f"\n...[truncated, {len(content)} chars total]"
+                return content
             else:
                 return "Tool executed successfully with no output."
         else:
             return f"Error: {execution.error}"
     
-    def get_conversation_summary(self) -> Dict[str, Any]:
-        """Get summary of the conversation."""
-        if not self.conversation_turns:
-            return {
-                "total_turns": 0,
-                "successful_turns": 0,
-                "failed_turns": 0,
-                "total_tool_executions": 0,
-                "unique_tools_used": [],
-                "unique_servers_used": []
-            }
-        
-        # Count successful turns based on whether they have any failed tool executions
-        successful_turns = []
-        failed_turns = []
-        
-        for turn in self.conversation_turns:
-            has_failures = any(not exec.success for exec in turn.tool_executions)
-            if has_failures:
-                failed_turns.append(turn)
-            else:
-                successful_turns.append(turn)
+    @staticmethod
+    def _empty_summary() -> Dict[str, Any]:
+        """Create zeroed running conversation aggregates."""
+        return {
+            "total_turns": 0,
+            "successful_turns": 0,
+            "failed_turns": 0,
+            "total_tool_executions": 0,
+            "unique_tools": set(),
+            "unique_servers": set()
+        }
+    
+    def _record_turn(self, turn: ConversationTurn) -> None:
+        """Append a finished turn and fold it into the running aggregates."""
+        self.conversation_turns.append(turn)
         
-        all_tool_executions = []
-        for turn in self.conversation_turns:
-            all_tool_executions.extend(turn.tool_executions)
+        summary = self._summary
+        summary["total_turns"] += 1
+        summary["total_tool_executions"] += len(turn.tool_executions)
         
-        unique_tools = list(set(exec.tool_name for exec in all_tool_executions))
-        unique_servers = list(set(exec.server_name for exec in all_tool_executions))
+        # A turn fails if any of its tool executions failed
+        turn_has_failure = False
+        for exec in turn.tool_executions:
+            summary["unique_tools"].add(exec.tool_name)
+            summary["unique_servers"].add(exec.server_name)
+            if not exec.success:
+                turn_has_failure = True
         
+        if turn_has_failure:
+            summary["failed_turns"] += 1
+        else:
+            summary["successful_turns"] += 1
+    
+    def get_conversation_summary(self) -> Dict[str, Any]:
+        """Get summary of the conversation."""
+        summary = self._summary
         return {
-            "total_turns": len(self.conversation_turns),
-            "successful_turns": len(successful_turns),
-            "failed_turns": len(failed_turns),
-            "total_tool_executions": len(all_tool_executions),
-            "unique_tools_used": unique_tools,
-            "unique_servers_used": unique_servers
+            "total_turns": summary["total_turns"],
+            "successful_turns": summary["successful_turns"],
+            "failed_turns": summary["failed_turns"],
+            "total_tool_executions": summary["total_tool_executions"],
+            "unique_tools_used": list(summary["unique_tools"]),
+            "unique_servers_used": list(summary["unique_servers"])
         }
     
     def clear_conversation(self) -> None:
         """Clear the conversation history and reset status."""
-        self.conversation_history = [self.system_message]  # Keep system message
+        self.conversation_history.clear()
+        self.conversation_history.append(self.system_message)  # Keep system message
+        self._history_token_estimate = self.openai_client.count_tokens(self.system_message)
+        self._prompt_cache_key = uuid.uuid4().hex
+        self._last_time_context = None
         self.conversation_turns = []
-        self.status_history = []
+        self._summary = self._empty_summary()
+        self._turn_export_lines = []
+        self.status_history.clear()
         self._update_status("idle", "Ready to chat")
         logger.info("Cleared conversation history")
     
@@ -506,42 +829,66 @@ If the user asks about an event which has happened outside of your context windo
         """Get recent conversation turns."""
         return self.conversation_turns[-limit:] if self.conversation_turns else []
     
-    def export_conversation(self) -> Dict[str, Any]:
-        """Export conversation data for analysis."""
+    @staticmethod
+    def _turn_to_dict(turn: ConversationTurn) -> Dict[str, Any]:
+        """Convert a conversation turn to its export representation."""
         return {
-            "conversation_summary": self.get_conversation_summary(),
-            "turns": [
+            "user_message": turn.user_message,
+            "assistant_response": turn.assistant_response,
+            "tool_executions": [
                 {
-                    "user_message": turn.user_message,
-                    "assistant_response": turn.assistant_response,
-                    "tool_executions": [
-                        {
-                            "tool_name": exec.tool_name,
-                            "server_name": exec.server_name,
-                            "arguments": exec.arguments,
-                            "success": exec.success,
-                            "result": exec.result,
-                            "error": exec.error,
-                            "execution_time": exec.execution_time
-                        }
-                        for exec in turn.tool_executions
-                    ],
-                    "thinking_time": turn.thinking_time,
-                    "total_time": turn.total_time,
-                    "timestamp": turn.timestamp
+                    "tool_name": exec.tool_name,
+                    "server_name": exec.server_name,
+                    "arguments": exec.arguments,
+                    "success": exec.success,
+                    "result": exec.result,
+                    "error": exec.error,
+                    "execution_time": exec.execution_time
                 }
-                for turn in self.conversation_turns
+                for exec in turn.tool_executions
             ],
-            "status_history": [
-                {
-                    "state": status.state,
-                    "activity": status.current_activity,
-                    "start_time": status.start_time,
-                    "current_tool": status.current_tool,
-                    "tool_progress": status.tool_progress,
-                    "tools_completed": status.tools_completed,
-                    "total_tools": status.total_tools
-                }
-                for status in self.status_history
-            ]
-        } 
\ No newline at end of file
+            "thinking_time": turn.thinking_time,
+            "total_time": turn.total_time,
+            "timestamp": turn.timestamp
+        }
+    
+    @staticmethod
+    def _status_to_dict(status: AIStatus) -> Dict[str, Any]:
+        """Convert an AI status to its export representation."""
+        return {
+            "state": status.state,
+            "activity": status.current_activity,
+            "start_time": status.start_time,
+            "current_tool": status.current_tool,
+            "tool_progress": status.tool_progress,
+            "tools_completed": status.tools_completed,
+            "total_tools": status.total_tools
+        }
+    
+    def export_conversation(self) -> Dict[str, Any]:
+        """Export conversation data for analysis."""
+        return {
+            "conversation_summary": self.get_conversation_summary(),
+            "turns": [self._turn_to_dict(turn) for turn in self.conversation_turns],
+            # Snapshot first: the loop thread may append statuses while this runs
+            "status_history": [self._status_to_dict(status) for status in list(self.status_history)]
+        }
+    
+    def export_conversation_iter(self) -> Iterator[str]:
+        """
+        Export conversation data as JSON Lines, one record at a time.
+        
+        Yields a summary record, then one record per turn, then one per status,
+        each tagged with a "type" key, so the full export is never held as one object.
+        """
+        yield json_dumps({"type": "summary", **self.get_conversation_summary()}) + "\n"
+        
+        # Only turns added since the last export need serializing
+        lines = self._turn_export_lines
+        for turn in islice(self.conversation_turns, len(lines), None):
+            lines.append(json_dumps({"type": "turn", **self._turn_to_dict(turn)}) + "\n")
+        yield from lines
+        
+        # Snapshot first: the loop thread may append statuses while this runs
+        for status in list(self.status_history):
+            yield json_dumps({"type": "status", **self._status_to_dict(status)}) + "\n"
@@ -2,18 +2,35 @@
 OpenAI client integration with GPT-4o-nano and function calling support.
 """
 import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional, Tuple, AsyncGenerator
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+import httpx
 import openai
+import tiktoken
 from openai.types.chat import ChatCompletion, ChatCompletionMessage
 from openai.types.chat.chat_completion import Choice
 
 from config.settings import settings
 from utils.logger import logger
-from utils.helpers import Timer
+from utils.helpers import Timer, json_dumps
 
+try:
+    import h2  # noqa: F401 - httpx only negotiates HTTP/2 when h2 is installed
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
 
-@dataclass
+# Per-message framing overhead on top of the content tokens
+_MESSAGE_TOKEN_OVERHEAD = 4
+
+# Per-request HTTP timeout for OpenAI calls (seconds)
+OPENAI_REQUEST_TIMEOUT = 60.0
+
+
+@dataclass(slots=True)
 class ChatMessage:
     """Represents a chat message."""
     role: str  # "system", "user", "assistant", "tool"
@@ -21,72 +38,244 @@ class ChatMessage:
     tool_calls: Optional[List[Dict]] = None
     tool_call_id: Optional[str] = None
     name: Optional[str] = None
+    cache_control: Optional[Dict[str, str]] = None  # Prompt-cache breakpoint marker
+    _openai: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
+    _token_count: Optional[int] = field(default=None, init=False, repr=False, compare=False)
+    
+    def to_openai(self) -> Dict[str, Any]:
+        """Convert to OpenAI format, memoized since messages are never modified after creation."""
+        if self._openai is not None:
+            return self._openai
+        
+        openai_msg = {
+            "role": self.role,
+            "content": self.content
+        }
+        
+        # Mark cache breakpoints using content blocks (Anthropic/Bedrock style)
+        if self.cache_control:
+            openai_msg["content"] = [
+                {"type": "text", "text": self.content, "cache_control": self.cache_control}
+            ]
+        
+        # Add tool calls if present
+        if self.tool_calls:
+            openai_msg["tool_calls"] = self.tool_calls
+        
+        # Add tool call ID if present (for tool response messages)
+        if self.tool_call_id:
+            openai_msg["tool_call_id"] = self.tool_call_id
+        
+        # Add name if present
+        if self.name:
+            openai_msg["name"] = self.name
+        
+        self._openai = openai_msg
+        return openai_msg
+
+
+def _buffer_tool_call_deltas(buffers: Dict[int, Dict[str, Any]], tool_call_deltas: List[Any]) -> None:
+    """Collect streamed tool-call fragments per index without repeated string concatenation."""
+    for tool_call in tool_call_deltas:
+        buffer = buffers.get(tool_call.index)
+        if buffer is None:
+            buffer = buffers[tool_call.index] = {"id": "", "name": "", "arg_parts": []}
+        
+        if tool_call.id:
+            buffer["id"] = tool_call.id
+        if tool_call.function:
+            if tool_call.function.name:
+                buffer["name"] = tool_call.function.name
+            if tool_call.function.arguments:
+                buffer["arg_parts"].append(tool_call.function.arguments)
+
+
+def _finalize_tool_calls(buffers: Dict[int, Dict[str, Any]]) -> List[Dict]:
+    """Join buffered tool-call fragments into OpenAI tool call dicts, in index order."""
+    return [
+        {
+            "id": buffer["id"],
+            "type": "function",
+            "function": {"name": buffer["name"], "arguments": "".join(buffer["arg_parts"])}
+        }
+        for _, buffer in sorted(buffers.items())
+    ]
 
 
 class OpenAIClient:
     """OpenAI client for chat completions with function calling."""
     
     def __init__(self):
-        self.client = openai.AsyncOpenAI(api_key=settings.openai_api_key)
+        # Shared connection pool so concurrent completions and embeddings reuse TCP/TLS connections
+        self._http_client = httpx.AsyncClient(
+            http2=_HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            timeout=httpx.Timeout(OPENAI_REQUEST_TIMEOUT, connect=5.0)
+        )
+        self.client = openai.AsyncOpenAI(api_key=settings.openai_api_key, http_client=self._http_client)
         self.model = settings.openai_model
         self.max_tokens = settings.openai_max_tokens
         self.temperature = settings.openai_temperature
+        self.embedding_model = settings.openai_embedding_model
+        self.max_context_tokens = settings.openai_max_context_tokens
+        # The BPE file may be downloaded with no timeout, so it loads on its own thread rather than
+        # stalling start-up or the event loop; token counts use the length estimate until then
+        self._encoding = None
+        self._encoding_ready = threading.Event()
+        threading.Thread(target=self._load_encoding, name="tiktoken-load", daemon=True).start()
+        
+        # Request deduplication: request hash -> future shared by identical in-flight requests
+        self._active_requests: Dict[str, asyncio.Future] = {}
         
-        # Request deduplication
-        self._active_requests = {}
-        self._request_lock = asyncio.Lock()
+        # Exact-match response cache: request hash -> (content, tool_calls), least recently used first
+        self._response_cache: "OrderedDict[str, Tuple[str, Optional[List[Dict]]]]" = OrderedDict()
+        self._response_cache_size = settings.response_cache_size
         
-    def _create_request_hash(self, messages: List[ChatMessage], functions: Optional[List[Dict]] = None) -> str:
-        """Create a hash for request deduplication."""
-        import hashlib
+        # Wrapped tools payloads for the most recent function definition lists
+        self._tools_wrap_cache: List[Tuple[List[Dict], List[Dict]]] = []
         
-        # Create a deterministic hash based on messages and functions
-        content = ""
+    def _create_request_hash(
+        self,
+        messages: List[ChatMessage],
+        functions: Optional[List[Dict]] = None,
+        model: Optional[str] = None
+    ) -> str:
+        """Create a hash identifying a request (model, messages and full function schemas)."""
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update((model or self.model).encode())
+        
+        # Separators keep field boundaries unambiguous
         for msg in messages:
-            content += f"{msg.role}:{msg.content or ''}"
+            hasher.update(f"\x1e{msg.role}\x1f{msg.content or ''}\x1f{msg.tool_call_id or ''}\x1f{msg.name or ''}".encode())
             if msg.tool_calls:
-                content += str(msg.tool_calls)
+                hasher.update(json_dumps(msg.tool_calls).encode())
+        
+        if functions:
+            hasher.update(b"\x1e")
+            hasher.update(json_dumps(functions).encode())
+        
+        return hasher.hexdigest()
+    
+    def _wrap_tools(self, functions: List[Dict]) -> List[Dict]:
+        """Wrap function definitions in the tools format, reusing the result for the same list object."""
+        # Holding the list itself (not just its id) keeps identity checks safe from id reuse
+        for cached_functions, tools in self._tools_wrap_cache:
+            if cached_functions is functions:
+                return tools
         
+        tools = [{"type": "function", "function": func} for func in functions]
+        self._tools_wrap_cache.append((functions, tools))
+        if len(self._tools_wrap_cache) > 4:
+            self._tools_wrap_cache.pop(0)
+        return tools
+    
+    def _build_request_params(
+        self,
+        openai_messages: List[Dict[str, Any]],
+        functions: Optional[List[Dict]],
+        stream: bool,
+        model: Optional[str] = None,
+        cache_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Build chat completion request parameters."""
+        request_params = {
+            "model": model or self.model,
+            "messages": openai_messages,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "stream": stream
+        }
+        
+        # Add functions if provided
         if functions:
-            # Only include function names and descriptions for hash (ignore full schemas)
-            func_content = ""
-            for func in functions:
-                func_content += f"{func.get('name', '')}:{func.get('description', '')}"
-            content += func_content
+            request_params["tools"] = self._wrap_tools(functions)
+            request_params["tool_choice"] = "auto"
         
-        return hashlib.md5(content.encode()).hexdigest()
+        # Route requests sharing a prefix to the same server-side prompt cache
+        if cache_key and settings.prompt_cache_key:
+            request_params["extra_body"] = {"prompt_cache_key": cache_key}
+        
+        return request_params
+    
+    def _response_cache_allowed(self) -> bool:
+        """Only cache deterministic responses unless explicitly allowed."""
+        return self._response_cache_size > 0 and (
+            self.temperature == 0 or settings.response_cache_nondeterministic
+        )
         
     async def chat_completion(
         self,
         messages: List[ChatMessage],
         functions: Optional[List[Dict]] = None,
-        stream: bool = False
+        stream: bool = False,
+        model: Optional[str] = None,
+        cache_key: Optional[str] = None
     ) -> Tuple[bool, str, Optional[List[Dict]], Optional[str]]:
         """
         Get chat completion from OpenAI.
         
+        Args:
+            model: Optional model override (defaults to the configured chat model)
+            cache_key: Optional prompt cache key shared by requests with the same prefix
+        
         Returns:
             (success, content, tool_calls, error)
         """
+        if stream:
+            return await self._request_completion(messages, functions, stream, model, cache_key)
+        
+        request_hash = self._create_request_hash(messages, functions, model)
+        
+        # Serve identical requests from the response cache
+        use_cache = self._response_cache_allowed()
+        if use_cache:
+            cached = self._response_cache.get(request_hash)
+            if cached is not None:
+                self._response_cache.move_to_end(request_hash)
+                logger.info("OpenAI response served from cache")
+                return True, cached[0], cached[1], None
+        
+        # Join an identical request that is already in flight instead of sending another.
+        # No await between the lookup and the insert, so no lock is needed.
+        in_flight = self._active_requests.get(request_hash)
+        if in_flight is not None:
+            logger.info("Joining identical in-flight OpenAI request")
+            return await asyncio.shield(in_flight)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._active_requests[request_hash] = future
+        try:
+            result = await self._request_completion(messages, functions, stream, model, cache_key)
+            future.set_result(result)
+        finally:
+            del self._active_requests[request_hash]
+            if not future.done():
+                # The leading request was cancelled; release anyone waiting on it
+                future.set_result((False, "", None, "OpenAI request was cancelled"))
+        
+        success, content, tool_calls, _ = result
+        if success and use_cache:
+            self._response_cache[request_hash] = (content, tool_calls)
+            if len(self._response_cache) > self._response_cache_size:
+                self._response_cache.popitem(last=False)
+        
+        return result
+    
+    async def _request_completion(
+        self,
+        messages: List[ChatMessage],
+        functions: Optional[List[Dict]],
+        stream: bool,
+        model: Optional[str],
+        cache_key: Optional[str]
+    ) -> Tuple[bool, str, Optional[List[Dict]], Optional[str]]:
+        """Send a chat completion request to OpenAI."""
         try:
             # Convert our message format to OpenAI format
-            openai_messages = self._convert_messages_to_openai(messages)
+            openai_messages = self._convert_messages_to_openai(self._truncate_for_send(messages))
             
             # Prepare request parameters
-            request_params = {
-                "model": self.model,
-                "messages": openai_messages,
-                "max_tokens": self.max_tokens,
-                "temperature": self.temperature,
-                "stream": stream
-            }
-            
-            # Add functions if provided
-            if functions:
-                request_params["tools"] = [
-                    {"type": "function", "function": func} for func in functions
-                ]
-                request_params["tool_choice"] = "auto"
+            request_params = self._build_request_params(openai_messages, functions, stream, model, cache_key)
             
             logger.info(f"Making OpenAI request with {len(openai_messages)} messages")
             
@@ -105,37 +294,28 @@ class OpenAIClient:
     async def chat_completion_stream(
         self,
         messages: List[ChatMessage],
-        functions: Optional[List[Dict]] = None
+        functions: Optional[List[Dict]] = None,
+        cache_key: Optional[str] = None
     ) -> AsyncGenerator[Tuple[bool, str, Optional[List[Dict]], Optional[str]], None]:
         """
         Get streaming chat completion from OpenAI.
         
+        Args:
+            cache_key: Optional prompt cache key shared by requests with the same prefix
+        
         Yields:
             (success, content_chunk, tool_calls, error)
         """
         try:
             # Convert our message format to OpenAI format
-            openai_messages = self._convert_messages_to_openai(messages)
+            openai_messages = self._convert_messages_to_openai(self._truncate_for_send(messages))
             
             # Prepare request parameters
-            request_params = {
-                "model": self.model,
-                "messages": openai_messages,
-                "max_tokens": self.max_tokens,
-                "temperature": self.temperature,
-                "stream": True
-            }
-            
-            # Add functions if provided
-            if functions:
-                request_params["tools"] = [
-                    {"type": "function", "function": func} for func in functions
-                ]
-                request_params["tool_choice"] = "auto"
+            request_params = self._build_request_params(openai_messages, functions, True, None, cache_key)
             
             logger.info(f"Making streaming OpenAI request with {len(openai_messages)} messages")
             
-            collected_tool_calls = []
+            tool_call_buffers: Dict[int, Dict[str, Any]] = {}
             
             async for chunk in await self.client.chat.completions.create(**request_params):
                 if chunk.choices:
@@ -148,26 +328,11 @@ class OpenAIClient:
                     
                     # Handle tool calls
                     if delta.tool_calls:
-                        for tool_call in delta.tool_calls:
-                            # Extend collected tool calls list if needed
-                            while len(collected_tool_calls) <= tool_call.index:
-                                collected_tool_calls.append({
-                                    "id": "",
-                                    "type": "function",
-                                    "function": {"name": "", "arguments": ""}
-                                })
-                            
-                            # Update the tool call
-                            if tool_call.id:
-                                collected_tool_calls[tool_call.index]["id"] = tool_call.id
-                            if tool_call.function.name:
-                                collected_tool_calls[tool_call.index]["function"]["name"] = tool_call.function.name
-                            if tool_call.function.arguments:
-                                collected_tool_calls[tool_call.index]["function"]["arguments"] += tool_call.function.arguments
+                        _buffer_tool_call_deltas(tool_call_buffers, delta.tool_calls)
                     
                     # Check if we're done
-                    if choice.finish_reason == "tool_calls" and collected_tool_calls:
-                        yield True, "", collected_tool_calls, None
+                    if choice.finish_reason == "tool_calls" and tool_call_buffers:
+                        yield True, "", _finalize_tool_calls(tool_call_buffers), None
                     elif choice.finish_reason == "stop":
                         yield True, "", None, None
                         
@@ -176,31 +341,66 @@ class OpenAIClient:
             logger.error(error_msg)
             yield False, "", None, error_msg
     
-    def _convert_messages_to_openai(self, messages: List[ChatMessage]) -> List[Dict[str, Any]]:
-        """Convert our message format to OpenAI format."""
-        openai_messages = []
+    def _load_encoding(self) -> None:
+        """Load the tiktoken encoding for the model; it stays None if its BPE file can't be fetched."""
+        try:
+            try:
+                self._encoding = tiktoken.encoding_for_model(self.model)
+            except KeyError:
+                # Models newer than the installed tiktoken
+                self._encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            logger.warning(f"Could not load tiktoken encoding, estimating tokens from length: {e}")
+        finally:
+            self._encoding_ready.set()
+    
+    def count_tokens(self, message: ChatMessage) -> int:
+        """Count a message's tokens, memoized on the message.
         
-        for msg in messages:
-            openai_msg = {
-                "role": msg.role,
-                "content": msg.content
-            }
-            
-            # Add tool calls if present
-            if msg.tool_calls:
-                openai_msg["tool_calls"] = msg.tool_calls
-            
-            # Add tool call ID if present (for tool response messages)
-            if msg.tool_call_id:
-                openai_msg["tool_call_id"] = msg.tool_call_id
-            
-            # Add name if present
-            if msg.name:
-                openai_msg["name"] = msg.name
+        This is the one token estimate used for both history summarization and send-time truncation.
+        """
+        if message._token_count is None:
+            text = message.content or ""
+            if message.tool_calls:
+                text += json_dumps(message.tool_calls)
             
-            openai_messages.append(openai_msg)
+            if not self._encoding_ready.is_set():
+                # Still loading: estimate, but don't memoize so the exact count replaces it later
+                return len(text) // 4 + _MESSAGE_TOKEN_OVERHEAD
+            if self._encoding is not None:
+                message._token_count = len(self._encoding.encode(text, disallowed_special=()))
+            else:
+                message._token_count = len(text) // 4
+        return message._token_count + _MESSAGE_TOKEN_OVERHEAD
+    
+    def _truncate_for_send(self, messages: List[ChatMessage]) -> List[ChatMessage]:
+        """Drop the oldest turns so the request fits the context budget, keeping the leading system prompt."""
+        messages = list(messages)
+        counts = [self.count_tokens(message) for message in messages]
+        if sum(counts) <= self.max_context_tokens:
+            return messages
+        
+        head = 1 if messages and messages[0].role == "system" else 0
+        
+        # Keep whole turns only (cut at user messages), and always the latest turn
+        cut = None
+        kept_tokens = sum(counts[:head])
+        for index in range(len(messages) - 1, head - 1, -1):
+            kept_tokens += counts[index]
+            if messages[index].role == "user":
+                if cut is not None and kept_tokens > self.max_context_tokens:
+                    break
+                cut = index
+        
+        if cut is None or cut <= head:
+            return messages
         
-        return openai_messages
+        logger.warning(f"Dropping {cut - head} oldest messages to fit the {self.max_context_tokens}-token context budget")
+        return messages[:head] + messages[cut:]
+    
+    def _convert_messages_to_openai(self, messages: List[ChatMessage]) -> List[Dict[str, Any]]:
+        """Convert our message format to OpenAI format."""
+        return [msg.to_openai() for msg in messages]
     
     def _handle_response(self, response: ChatCompletion, elapsed_time: float) -> Tuple[bool, str, Optional[List[Dict]], Optional[str]]:
         """Handle non-streaming response."""
@@ -225,6 +425,11 @@ class OpenAIClient:
                     })
             
             logger.info(f"OpenAI response received in {elapsed_time:.2f}s")
+            
+            usage = response.usage
+            details = getattr(usage, "prompt_tokens_details", None) if usage else None
+            if details is not None and details.cached_tokens is not None:
+                logger.debug(f"Prompt tokens: {usage.prompt_tokens} ({details.cached_tokens} cached)")
             return True, content, tool_calls, None
             
         except Exception as e:
@@ -235,7 +440,7 @@ class OpenAIClient:
     async def _handle_streaming_response(self, request_params: Dict) -> Tuple[bool, str, Optional[List[Dict]], Optional[str]]:
         """Handle streaming response for non-generator usage."""
         content_parts = []
-        tool_calls = []
+        tool_call_buffers: Dict[int, Dict[str, Any]] = {}
         
         try:
             async for chunk in await self.client.chat.completions.create(**request_params):
@@ -247,29 +452,20 @@ class OpenAIClient:
                         content_parts.append(delta.content)
                     
                     if delta.tool_calls:
-                        for tool_call in delta.tool_calls:
-                            # Handle tool call collection (simplified for non-streaming)
-                            if tool_call.function and tool_call.function.name:
-                                tool_calls.append({
-                                    "id": tool_call.id,
-                                    "type": "function",
-                                    "function": {
-                                        "name": tool_call.function.name,
-                                        "arguments": tool_call.function.arguments or ""
-                                    }
-                                })
+                        _buffer_tool_call_deltas(tool_call_buffers, delta.tool_calls)
             
             content = "".join(content_parts)
-            return True, content, tool_calls if tool_calls else None, None
+            tool_calls = _finalize_tool_calls(tool_call_buffers) if tool_call_buffers else None
+            return True, content, tool_calls, None
             
         except Exception as e:
             error_msg = f"Error processing streaming response: {str(e)}"
             logger.error(error_msg)
             return False, "", None, error_msg
     
-    def create_system_message(self, content: str) -> ChatMessage:
-        """Create a system message."""
-        return ChatMessage(role="system", content=content)
+    def create_system_message(self, content: str, cache_control: Optional[Dict[str, str]] = None) -> ChatMessage:
+        """Create a system message, optionally marked as a prompt-cache breakpoint."""
+        return ChatMessage(role="system", content=content, cache_control=cache_control)
     
     def create_user_message(self, content: str) -> ChatMessage:
         """Create a user message."""
@@ -283,6 +479,26 @@ class OpenAIClient:
         """Create a tool response message."""
         return ChatMessage(role="tool", content=content, tool_call_id=tool_call_id, name=name)
     
+    async def create_embedding(self, text: str) -> Tuple[bool, Optional[List[float]], Optional[str]]:
+        """
+        Create an embedding vector for the given text.
+        
+        Returns:
+            Tuple of (success, embedding, error)
+        """
+        try:
+            response = await self.client.embeddings.create(model=self.embedding_model, input=text)
+            return True, response.data[0].embedding, None
+        except Exception as e:
+            error_msg = f"OpenAI embedding error: {str(e)}"
+            logger.error(error_msg)
+            return False, None, error_msg
+    
+    async def aclose(self) -> None:
+        """Close the underlying HTTP connection pool."""
+        await self.client.close()
+        await self._http_client.aclose()  # The SDK may leave a caller-supplied client open
+    
     async def test_connection(self) -> Tuple[bool, str]:
         """Test the OpenAI connection."""
         try:
@@ -291,7 +507,8 @@ class OpenAIClient:
                 self.create_user_message("Hello! Just say 'Hello back' to confirm the connection.")
             ]
             
-            success, content, _, error = await self.chat_completion(test_messages)
+            # Go straight to the API: a cached or joined reply would not prove the connection works
+            success, content, _, error = await self._request_completion(test_messages, None, False, None, None)
             
             if success:
                 return True, f"Connection successful. Model response: {content}"
@@ -4,19 +4,19 @@ Main Streamlit application for the MCP Server Tester.
 """
 import asyncio
 import streamlit as st
-import pandas as pd
-from typing import Dict, List, Optional
+import streamlit.components.v1 as components
+from streamlit.errors import StreamlitAPIException
+from typing import Any, Dict, List, Optional
 import time
-import json
 
 # Import our custom modules
 from config.settings import settings
 from mcp_client.server_manager import MCPServerManager
 from mcp_client.tool_executor import MCPToolExecutor
 from ai.openai_client import OpenAIClient
-from ai.function_handler import FunctionHandler
+from ai.function_handler import ConversationTurn, FunctionHandler
 from utils.logger import logger
-from utils.helpers import async_to_sync, format_tool_call, format_tool_result
+from utils.helpers import AsyncLoopThread, format_tool_call, format_tool_result, json_dumps
 
 
 # Page configuration
@@ -27,8 +27,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for better styling
-st.markdown("""
+# Custom CSS for better styling. Elements that aren't re-emitted on a rerun are
+# removed from the page, so the stylesheet is sent on every run.
+_STATIC_CSS = """
 <style>
     .main-header {
         text-align: center;
@@ -196,45 +197,73 @@ st.markdown("""
         display: none;
     }
 </style>
+"""
+st.markdown(_STATIC_CSS, unsafe_allow_html=True)
 
+# Auto-scroll script. It runs inside a zero-height component iframe, so it works
+# on the parent document.
+_SCROLL_HTML = """
 <script>
-    // Auto-scroll to bottom function
-    function scrollToBottom() {
-        window.scrollTo({
-            top: document.body.scrollHeight,
-            behavior: 'smooth'
-        });
-    }
-    
-    // Auto-scroll when new messages are added
-    function setupAutoScroll() {
-        // Watch for changes in the main content area
-        const observer = new MutationObserver(function(mutations) {
-            mutations.forEach(function(mutation) {
-                if (mutation.type === 'childList' && mutation.addedNodes.length > 0) {
-                    // Small delay to ensure content is rendered
-                    setTimeout(scrollToBottom, 100);
-                }
-            });
-        });
-        
-        // Start observing
-        const targetNode = document.querySelector('[data-testid="stVerticalBlock"]');
-        if (targetNode) {
-            observer.observe(targetNode, {
-                childList: true,
-                subtree: true
-            });
-        }
+    // One frame-aligned scroll to the bottom anchor, which sits after the last message
+    const anchor = window.parent.document.getElementById('chat-bottom-anchor');
+    if (anchor) {
+        requestAnimationFrame(() => anchor.scrollIntoView({ behavior: 'smooth', block: 'end' }));
     }
-    
-    // Initialize auto-scroll when page loads
-    document.addEventListener('DOMContentLoaded', setupAutoScroll);
-    
-    // Also setup when Streamlit reruns
-    window.addEventListener('load', setupAutoScroll);
 </script>
-""", unsafe_allow_html=True)
+"""
+
+# Icons for AI states, shared by the activity monitor and the processing summary
+_STATE_COLORS = {
+    "idle": "🟢",
+    "thinking": "🟡",
+    "executing_tool": "🔵",
+    "responding": "🟠"
+}
+_STATE_ICONS = {
+    "thinking": "🧠",
+    "executing_tool": "🔧",
+    "responding": "💬"
+}
+
+# Server status indicators, built once for the known statuses
+_STATUS_HTML = {
+    status: f'<span class="status-indicator status-{status}"></span>{status.title()}'
+    for status in ("connected", "disconnected", "error", "connecting")
+}
+
+# Troubleshooting tips shown under a server's error details
+_TROUBLESHOOTING_MD = """\
+**Common Issues:**
+- **Command not found**: Make sure the command is installed and in your PATH
+- **Permission denied**: Check file permissions and execution rights
+- **Module not found**: Ensure all dependencies are installed
+- **Port already in use**: Check if another instance is running
+- **Environment variables**: Verify required environment variables are set
+
+**Debug Steps:**
+1. Try running the command manually in your terminal
+2. Check the stderr output above for specific error messages
+3. Verify the command path and arguments are correct
+4. Ensure all required dependencies are installed
+"""
+
+
+def run_coro(coro):
+    """Run a coroutine on the persistent background loop and wait for its result.
+    
+    MCP stdio transports and the OpenAI connection pool are bound to the loop
+    they were created on, so every call must go through the same loop.
+    """
+    return AsyncLoopThread.instance().submit(coro).result()
+
+
+def _rerun_fragment():
+    """Rerun just the current fragment, or the whole app when this is a full-app run."""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        # Fragment-scoped reruns are only allowed while a fragment itself is rerunning
+        st.rerun()
 
 
 @st.cache_resource
@@ -259,25 +288,64 @@ def initialize_components():
         return None, None, None, None
 
 
+@st.cache_data(max_entries=512, show_spinner=False)
+def _json_str(payload_key: str, _payload: Any) -> str:
+    """Pretty-print a payload once per key; the leading underscore keeps Streamlit from hashing it."""
+    return json_dumps(_payload, indent=True)
+
+
+@st.cache_data(ttl=2.0, show_spinner=False)
+def _cached_servers_info(server_epoch: int, _server_manager: MCPServerManager) -> List[Dict]:
+    """Snapshot of all server cards; the epoch is bumped whenever this session changes a server."""
+    return _server_manager.get_all_servers_info()
+
+
+@st.cache_data(ttl=2.0, show_spinner=False)
+def _cached_status_summary(server_epoch: int, _server_manager: MCPServerManager) -> Dict[str, int]:
+    """Status counts for the sidebar metrics, cached on the same epoch as the server cards."""
+    return _server_manager.get_server_status_summary()
+
+
+def _bump_server_epoch():
+    """Invalidate the cached server snapshots after a connect/disconnect/reload."""
+    st.session_state.server_epoch = st.session_state.get("server_epoch", 0) + 1
+
+
+def _preview_args(arguments: Dict[str, Any], limit: int = 100) -> str:
+    """Build a short "k=v, ..." preview, skipping long values and stopping once past the limit."""
+    parts = []
+    length = 0
+    for key, value in arguments.items():
+        value_str = str(value)
+        if len(value_str) >= 50:
+            continue
+        part = f"{key}={value_str}"
+        length += len(part) + (2 if parts else 0)
+        parts.append(part)
+        if length > limit:
+            break
+    
+    preview = ", ".join(parts)
+    if len(preview) > limit:
+        preview = preview[:limit] + "..."
+    return preview
+
+
 def render_status_indicator(status: str) -> str:
     """Render a status indicator for servers."""
-    status_classes = {
-        "connected": "status-connected",
-        "disconnected": "status-disconnected",
-        "error": "status-error",
-        "connecting": "status-connecting"
-    }
-    class_name = status_classes.get(status, "status-disconnected")
-    return f'<span class="status-indicator {class_name}"></span>{status.title()}'
+    html = _STATUS_HTML.get(status)
+    if html is None:
+        html = f'<span class="status-indicator status-disconnected"></span>{status.title()}'
+    return html
 
 
-def render_server_panel(server_manager: MCPServerManager):
+def render_server_panel(server_manager: MCPServerManager, openai_client: OpenAIClient):
     """Render the MCP server management panel."""
     st.sidebar.header("🖥️ MCP Servers")
     
     # Server status summary
     if server_manager._initialized:
-        status_summary = server_manager.get_server_status_summary()
+        status_summary = _cached_status_summary(st.session_state.get("server_epoch", 0), server_manager)
         col1, col2 = st.sidebar.columns(2)
         with col1:
             st.metric("Connected", status_summary["connected"])
@@ -295,59 +363,60 @@ def render_server_panel(server_manager: MCPServerManager):
         else:
             st.sidebar.info("ℹ️ No servers configured - add servers via config files")
     
+    # Server operations run on the background loop; a fragment polls them so the page stays responsive
+    pending_ops = st.session_state.setdefault("pending_server_ops", {})
+    for kind, text in st.session_state.pop("server_op_messages", []):
+        if kind == "success":
+            st.sidebar.success(text)
+        else:
+            st.sidebar.error(text)
+    
     # Manual server controls
     col1, col2 = st.sidebar.columns(2)
     with col1:
-        if st.button("🔄 Reconnect All", use_container_width=True):
-            with st.spinner("Reconnecting servers..."):
-                results = async_to_sync(server_manager.refresh_servers)()
-                
-                success_count = sum(1 for success in results.values() if success)
-                total_count = len(results)
-                
-                if success_count > 0:
-                    if success_count == total_count:
-                        st.sidebar.success(f"✅ All {success_count} servers connected")
-                    else:
-                        st.sidebar.success(f"✅ {success_count}/{total_count} servers connected")
-                else:
-                    st.sidebar.error("❌ Failed to connect to any servers")
+        if st.button("🔄 Reconnect All", use_container_width=True, disabled=("refresh", None) in pending_ops):
+            _submit_server_op(pending_ops, ("refresh", None), server_manager.refresh_servers())
     
     with col2:
-        if st.button("🆕 Reload Config", use_container_width=True):
+        # Reloading closes the OpenAI client, so wait for any in-flight reply first
+        if st.button("🆕 Reload Config", use_container_width=True, disabled=st.session_state.get("pending_turn") is not None):
             with st.spinner("Reloading configuration..."):
+                # Close the client being replaced so its HTTP/2 connection pool isn't leaked
+                run_coro(openai_client.aclose())
+                
                 # Clear the cache and session state to force re-initialization
                 st.cache_resource.clear()
+                _bump_server_epoch()
                 if "servers_initialized" in st.session_state:
                     del st.session_state.servers_initialized
                 if "initial_connection_results" in st.session_state:
                     del st.session_state.initial_connection_results
+                # The new client's connection has not been checked yet
+                if "openai_connection_ok" in st.session_state:
+                    del st.session_state.openai_connection_ok
                 st.rerun()
     
     # Servers are now auto-initialized when the app starts
     
     # Display server list
     st.sidebar.subheader("Server Status")
-    servers_info = server_manager.get_all_servers_info()
+    servers_info = _cached_servers_info(st.session_state.get("server_epoch", 0), server_manager)
     
     for server_info in servers_info:
         with st.sidebar.expander(f"{server_info['name']} ({server_info['tools_count']} tools)"):
-            # Status
-            status_html = render_status_indicator(server_info['status'])
-            st.markdown(status_html, unsafe_allow_html=True)
+            # Status, description, tools and connection info go out as one markdown element
+            blocks = [render_status_indicator(server_info['status'])]
+            if server_info['description']:
+                blocks.append(f"*{server_info['description']}*")
             
-            # Description
-            st.caption(server_info['description'])
-            
-            # Tools
             if server_info['tools']:
-                st.write("**Available Tools:**")
-                for tool in server_info['tools']:
-                    st.write(f"• `{tool['name']}`: {tool['description']}")
+                tool_lines = "\n".join(f"- `{tool['name']}`: {tool['description']}" for tool in server_info['tools'])
+                blocks.append(f"**Available Tools:**\n{tool_lines}")
             
-            # Connection info
             if server_info['connection_time']:
-                st.write(f"**Connection Time:** {server_info['connection_time']:.2f}s")
+                blocks.append(f"**Connection Time:** {server_info['connection_time']:.2f}s")
+            
+            st.markdown("\n\n".join(blocks), unsafe_allow_html=True)
             
             # Error info
             if server_info['last_error']:
@@ -356,20 +425,14 @@ def render_server_panel(server_manager: MCPServerManager):
             # Server controls
             col1, col2 = st.columns(2)
             with col1:
-                if st.button(f"Connect", key=f"connect_{server_info['name']}"):
-                    success = async_to_sync(server_manager.connect_server)(server_info['name'])
-                    if success:
-                        st.success("Connected!")
-                        st.rerun()
-                    else:
-                        st.error("Connection failed")
+                op = ("connect", server_info['name'])
+                if st.button(f"Connect", key=f"connect_{server_info['name']}", disabled=op in pending_ops):
+                    _submit_server_op(pending_ops, op, server_manager.connect_server(server_info['name']))
             
             with col2:
-                if st.button(f"Disconnect", key=f"disconnect_{server_info['name']}"):
-                    success = async_to_sync(server_manager.disconnect_server)(server_info['name'])
-                    if success:
-                        st.success("Disconnected!")
-                        st.rerun()
+                op = ("disconnect", server_info['name'])
+                if st.button(f"Disconnect", key=f"disconnect_{server_info['name']}", disabled=op in pending_ops):
+                    _submit_server_op(pending_ops, op, server_manager.disconnect_server(server_info['name']))
             
             # Show Error Details button for servers with errors
             if server_info.get('has_detailed_errors', False):
@@ -415,48 +478,116 @@ def render_server_panel(server_manager: MCPServerManager):
                         
                         # Server configuration
                         st.markdown("**📋 Server Configuration:**")
-                        st.json(error_details['server_config'])
+                        server_config = error_details['server_config']
+                        config_key = f"error-config-{error_details['server_name']}-{error_details['error_timestamp']}-{server_config['enabled']}"
+                        st.code(_json_str(config_key, server_config), language="json")
                         
                         # Troubleshooting tips
                         st.markdown("**💡 Troubleshooting Tips:**")
-                        st.markdown("""
-                        **Common Issues:**
-                        - **Command not found**: Make sure the command is installed and in your PATH
-                        - **Permission denied**: Check file permissions and execution rights
-                        - **Module not found**: Ensure all dependencies are installed
-                        - **Port already in use**: Check if another instance is running
-                        - **Environment variables**: Verify required environment variables are set
-                        
-                        **Debug Steps:**
-                        1. Try running the command manually in your terminal
-                        2. Check the stderr output above for specific error messages
-                        3. Verify the command path and arguments are correct
-                        4. Ensure all required dependencies are installed
-                        """)
+                        st.markdown(_TROUBLESHOOTING_MD)
                     else:
                         st.warning("No detailed error information available for this server.")
+    
+    if pending_ops:
+        with st.sidebar:
+            st.fragment(_poll_server_ops, run_every=0.2)()
+
+
+def _submit_server_op(pending_ops: Dict, op, coro):
+    """Start a server operation on the background loop and remember when it started."""
+    pending_ops[op] = (AsyncLoopThread.instance().submit(coro), time.time())
+
+
+def _server_op_timeout() -> float:
+    """Longest a server operation may run before the poller gives up on it.
+    
+    A connect makes up to three attempts, each sending two requests bounded by MCP_TIMEOUT,
+    with backoff sleeps in between.
+    """
+    return 3 * (2 * settings.mcp_timeout + 1) + 5
+
+
+def _server_op_message(op, outcome):
+    """Describe a finished server operation as a (kind, text) pair for the sidebar."""
+    kind, server_name = op
+    if isinstance(outcome, BaseException):
+        return "error", f"❌ {server_name or 'Reconnect'} failed: {outcome}"
+    
+    if kind == "refresh":
+        success_count = sum(1 for success in outcome.values() if success)
+        total_count = len(outcome)
+        if success_count == 0:
+            return "error", "❌ Failed to connect to any servers"
+        if success_count == total_count:
+            return "success", f"✅ All {success_count} servers connected"
+        return "success", f"✅ {success_count}/{total_count} servers connected"
+    
+    if kind == "connect":
+        return ("success", f"✅ {server_name}: Connected!") if outcome else ("error", f"❌ {server_name}: Connection failed")
+    return ("success", f"✅ {server_name}: Disconnected!") if outcome else ("error", f"❌ {server_name}: Disconnect failed")
+
+
+def _poll_server_ops():
+    """Show in-flight server operations; once any finish, record their results and rerun the page."""
+    pending_ops = st.session_state.get("pending_server_ops", {})
+    deadline = time.time() - _server_op_timeout()
+    finished = [op for op, (future, started) in pending_ops.items() if future.done() or started < deadline]
+    
+    if not finished:
+        labels = {"refresh": "Reconnecting servers", "connect": "Connecting", "disconnect": "Disconnecting"}
+        st.caption("\n\n".join(
+            f"⏳ {labels[kind]}{f' {name}' if name else ''}..." for kind, name in pending_ops
+        ))
+        return
+    
+    messages = st.session_state.setdefault("server_op_messages", [])
+    for op in finished:
+        future, _ = pending_ops.pop(op)
+        if not future.done():
+            future.cancel()
+            outcome = TimeoutError("timed out and was cancelled")
+        else:
+            try:
+                outcome = future.result()
+            except Exception as e:
+                outcome = e
+        messages.append(_server_op_message(op, outcome))
+    
+    _bump_server_epoch()
+    st.rerun()
 
 
 def render_ai_status_panel(function_handler: FunctionHandler):
     """Render the real-time AI status panel."""
+    # Expanders don't report their state, so a toggle decides whether the panel is built at all
+    if not st.toggle("🧠 AI Activity Monitor", key="ai_monitor_expanded"):
+        return
+    
+    # While the AI is active only this fragment re-runs on a timer, not the whole page
+    active = function_handler.get_current_status().state != "idle"
+    st.fragment(_render_ai_status_body, run_every=0.5 if active else None)(function_handler)
+
+
+def _render_ai_status_body(function_handler: FunctionHandler):
+    """Render the contents of the AI status panel."""
     current_status = function_handler.get_current_status()
     
-    # Create expandable status panel
-    with st.expander("🧠 AI Activity Monitor", expanded=False):
+    # Timer reruns reuse the fragment's original arguments, so the previous state lives in the session.
+    # Once the AI goes idle, rerun the whole page to show the final result and drop the timer.
+    was_active = st.session_state.get("ai_monitor_last_state", "idle") != "idle"
+    st.session_state.ai_monitor_last_state = current_status.state
+    if was_active and current_status.state == "idle":
+        st.rerun()
+    
+    with st.container(border=True):
         # Status indicator with color coding
-        state_colors = {
-            "idle": "🟢",
-            "thinking": "🟡", 
-            "executing_tool": "🔵",
-            "responding": "🟠"
-        }
-        
-        state_color = state_colors.get(current_status.state, "⚪")
+        state_color = _STATE_COLORS.get(current_status.state, "⚪")
         st.markdown(f"**Status:** {state_color} {current_status.state.title()}")
         st.markdown(f"**Activity:** {current_status.current_activity}")
         
-        # Show elapsed time
-        elapsed = time.time() - current_status.start_time
+        # Show elapsed time (one clock read serves the whole panel)
+        now = time.time()
+        elapsed = now - current_status.start_time
         st.markdown(f"**Elapsed:** {elapsed:.1f}s")
         
         # Show tool-specific information
@@ -474,22 +605,264 @@ def render_ai_status_panel(function_handler: FunctionHandler):
                 st.markdown(f"**Tools:** {current_status.tools_completed}/{current_status.total_tools}")
         
         # Show recent status history
-        status_history = function_handler.get_status_history()
+        status_history = function_handler.get_recent_statuses(5)
         if status_history:
             st.markdown("**Recent Activities:**")
             # Show last 5 activities
-            for status in status_history[-5:]:
-                elapsed_for_status = time.time() - status.start_time
+            for status in status_history:
+                elapsed_for_status = now - status.start_time
                 st.markdown(f"• {status.current_activity} ({elapsed_for_status:.1f}s ago)")
+
+
+def _render_pending_turn(function_handler: FunctionHandler):
+    """Poll the in-flight message; once it completes, record the reply and rerun the page."""
+    future = st.session_state.get("pending_turn")
+    if future is None:
+        return
+    
+    if not future.done():
+        # No wall-clock deadline here: each OpenAI request is bounded by the HTTP client timeout
+        # and each MCP call by MCP_TOOL_TIMEOUT, so the turn always finishes on its own
+        with st.status("🤖 Processing your message...", expanded=True):
+            st.write("🧠 **AI is analyzing your request...**")
+            st.caption(function_handler.get_current_status().current_activity)
         
-        # Auto-refresh when AI is active
-        if current_status.state != "idle":
-            time.sleep(0.5)  # Small delay to prevent excessive updates
-            st.rerun()
+        # Show the reply streamed so far as a single element, redrawn once per poll
+        streamed = st.session_state.get("pending_stream")
+        if streamed:
+            # Fold the chunks received so far into one string, so the buffer stays one string plus
+            # whatever arrived since the last poll. The slice assignment is a single operation,
+            # so appends racing in from the loop thread land after it.
+            count = len(streamed)
+            text = "".join(streamed[:count])
+            streamed[:count] = [text]
+            with st.chat_message("assistant"):
+                st.markdown(text)
+        return
+    
+    del st.session_state.pending_turn
+    st.session_state.pop("pending_stream", None)
+    
+    # Show processing status with enhanced AI status information
+    with st.status("🤖 Processing your message...", expanded=True) as status:
+        # Show initial thinking status
+        st.write("🧠 **AI is analyzing your request...**")
+        
+        # One timestamp for the reply, whichever way it turned out
+        response_timestamp = time.strftime("%H:%M:%S")
+        
+        try:
+            # Handle the user message with enhanced status tracking
+            turn = future.result()
+            
+            # Get final AI status to show what happened during processing
+            final_status = function_handler.get_current_status()
+            recent_history = function_handler.get_recent_statuses(10)
+            
+            # Show processing summary
+            st.write("✅ **Response generated successfully!**")
+            
+            # Display tool execution details if any tools were used
+            if turn.tool_executions:
+                st.write("🛠️ **Tool Execution Summary:**")
+                
+                # Show overview first; the success/failure counts come from a single pass
+                total_tools = len(turn.tool_executions)
+                successful_count = 0
+                for exec in turn.tool_executions:
+                    if exec.success:
+                        successful_count += 1
+                failed_count = total_tools - successful_count
+                
+                overview_parts = []
+                if successful_count:
+                    overview_parts.append(f"✅ {successful_count} successful")
+                if failed_count:
+                    overview_parts.append(f"❌ {failed_count} failed")
+                
+                st.info(f"📊 **Total:** {total_tools} tool(s) executed - {', '.join(overview_parts)}")
+                
+                # Show individual tool executions in a simple list, emitted as one markdown element
+                tool_lines = []
+                for i, exec in enumerate(turn.tool_executions, 1):
+                    status_icon = "✅" if exec.success else "❌"
+                    execution_time = f" ({exec.execution_time:.2f}s)" if exec.execution_time else ""
+                    
+                    # Show each tool execution
+                    tool_lines.append(f"  **{i}.** {status_icon} **{exec.tool_name}** on *{exec.server_name}*{execution_time}")
+                    
+                    # Show tool arguments in a compact format
+                    if exec.arguments:
+                        args_str = _preview_args(exec.arguments)
+                        tool_lines.append(f"     📋 **Args:** {args_str}")
+                    
+                    # Show result or error
+                    if exec.success and exec.result:
+                        result_str = str(exec.result)
+                        if len(result_str) > 150:
+                            result_str = result_str[:150] + "..."
+                        tool_lines.append(f"     📤 **Result:** {result_str}")
+                    elif not exec.success and exec.error:
+                        tool_lines.append(f"     ❌ **Error:** {exec.error}")
+                
+                st.markdown("\n\n".join(tool_lines))
+            
+            # Show AI processing stages from status history
+            summary_lines = []
+            if recent_history:
+                st.write("---")
+                st.write("🔍 **AI Processing Stages:**")
+                
+                # Show last few status updates
+                relevant_statuses = [s for s in recent_history if s.state != "idle"]
+                if relevant_statuses:
+                    stage_lines = []
+                    for i, status_item in enumerate(relevant_statuses, 1):
+                        elapsed = time.time() - status_item.start_time
+                        state_icon = _STATE_ICONS.get(status_item.state, "⚡")
+                        
+                        stage_info = f"  **{i}.** {state_icon} {status_item.current_activity}"
+                        
+                        # Add tool-specific information
+                        if status_item.current_tool:
+                            stage_info += f" → **{status_item.current_tool}**"
+                        if status_item.tool_progress:
+                            stage_info += f" *({status_item.tool_progress})*"
+                        
+                        # Add progress information if available
+                        if status_item.total_tools > 0 and status_item.tools_completed >= 0:
+                            progress_info = f" [{status_item.tools_completed}/{status_item.total_tools}]"
+                            stage_info += progress_info
+                        
+                        stage_lines.append(stage_info)
+                    
+                    st.markdown("\n\n".join(stage_lines))
+                
+                # Show summary of what the AI did
+                if turn.tool_executions:
+                    summary_lines.append("**Summary:** AI analyzed your request, decided to use tools, and executed them to provide a response.")
+                else:
+                    summary_lines.append("**Summary:** AI analyzed your request and provided a direct response without using any tools.")
+            
+            # Add assistant response
+            st.session_state.messages.append({
+                "role": "assistant", 
+                "content": turn.assistant_response,
+                "timestamp": response_timestamp,
+                "turn_index": len(st.session_state.conversation_turns)
+            })
+            
+            # Store the conversation turn
+            st.session_state.conversation_turns.append(turn)
+            
+            # Show final summary, reusing the counts from the overview
+            if turn.tool_executions and overview_parts:
+                summary_lines.append(f"🛠️ **Tools used:** {', '.join(overview_parts)}")
+            
+            # The summary and the tools-used line go out together
+            if summary_lines:
+                st.markdown("\n\n".join(summary_lines))
+            
+            status.update(label="✅ Message processed successfully!", state="complete")
+            
+        except Exception as e:
+            st.write(f"❌ **Error during processing:** {str(e)}")
+            status.update(label="❌ Error processing message", state="error")
+            
+            # Add error message to chat
+            st.session_state.messages.append({
+                "role": "assistant", 
+                "content": f"I encountered an error: {str(e)}",
+                "timestamp": response_timestamp
+            })
+    
+    # Rerun the whole page to show the new messages
+    st.rerun()
+
+
+def _render_tool_executions(turn: ConversationTurn):
+    """Render the collapsible tool-execution details of a past conversation turn.
+    
+    The details sit behind a toggle rather than an expander: an expander still builds
+    its contents while collapsed, whereas a closed toggle emits nothing below it.
+    """
+    executions = turn.tool_executions
+    total_count = len(executions)
+    success_count = sum(1 for exec in executions if exec.success)
+    
+    if success_count == total_count:
+        status_color = "🟢"
+        status_text = "All successful"
+    elif success_count > 0:
+        status_color = "🟡"
+        status_text = f"{success_count}/{total_count} successful"
+    else:
+        status_color = "🔴"
+        status_text = "All failed"
+    
+    label = f"🛠️ Tool Executions ({total_count}) {status_color} {status_text}"
+    if not st.toggle(label, key=f"tool_execs_{turn.timestamp}"):
+        return
+    
+    with st.container(border=True):
+        for j, exec in enumerate(executions):
+            success = exec.success
+            status_icon = "✅" if success else "❌"
+            time_str = f"({exec.execution_time:.2f}s)" if exec.execution_time else ""
+            
+            st.markdown(f"**{j+1}.** {status_icon} **{exec.tool_name}** on *{exec.server_name}* {time_str}")
+            
+            # Create columns for arguments and results
+            exec_col1, exec_col2 = st.columns(2)
+            
+            with exec_col1:
+                if exec.arguments:
+                    st.markdown("**📋 Arguments:**")
+                    st.code(_json_str(f"{turn.timestamp}-{j}-args", exec.arguments), language="json")
+            
+            with exec_col2:
+                if success and exec.result:
+                    st.markdown("**📤 Result:**")
+                    kind, rendered = exec.rendered_result()
+                    st.code(rendered, language="json" if kind == "json" else None)
+                elif exec.error:
+                    st.markdown("**❌ Error:**")
+                    st.error(exec.error)
+            
+            if j < total_count - 1:
+                st.divider()
+
+
+def _render_history_message(message: Dict[str, Any], conversation_turns: List[ConversationTurn]):
+    """Render one past chat message: header and body as a single markdown element, then its tool details."""
+    role = message["role"]
+    timestamp = message.get("timestamp", "")
+    
+    # Use Streamlit's native chat message components
+    with st.chat_message(role):
+        if role == "user":
+            st.markdown(f"**You** _{timestamp}_\n\n{message['content']}")
+        
+        elif role == "assistant":
+            st.markdown(f"**🤖 Assistant** _{timestamp}_\n\n{message['content']}")
+            
+            # Each assistant reply records the conversation turn it belongs to
+            turn_index = message.get("turn_index")
+            
+            # Show tool executions if any for this turn
+            if turn_index is not None and turn_index < len(conversation_turns):
+                turn = conversation_turns[turn_index]
+                if turn.tool_executions:
+                    _render_tool_executions(turn)
 
 
+@st.fragment
 def render_chat_interface(function_handler: FunctionHandler):
-    """Render the main chat interface with improved UI."""
+    """Render the main chat interface with improved UI.
+    
+    Runs as a fragment: chat widgets rerun only this panel, not the sidebar,
+    start-up checks and analytics.
+    """
     st.header("💬 MCP Chat Interface")
     
     # Initialize session state for chat
@@ -499,14 +872,22 @@ def render_chat_interface(function_handler: FunctionHandler):
     if "conversation_turns" not in st.session_state:
         st.session_state.conversation_turns = []
     
+    if "chat_window" not in st.session_state:
+        st.session_state.chat_window = settings.chat_history_window
+    
     # Chat controls row
     col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
     with col1:
         st.subheader("Ask me anything!")
     with col2:
-        if st.button("🧹 Clear Chat", use_container_width=True):
+        # Clearing while a turn is in flight would race the loop thread's writes to the history
+        if st.button("🧹 Clear Chat", use_container_width=True, disabled=st.session_state.get("pending_turn") is not None):
             st.session_state.messages = []
             st.session_state.conversation_turns = []
+            st.session_state.chat_window = settings.chat_history_window
+            st.session_state.pop("pending_stream", None)
+            st.session_state.pop("export_key", None)
+            st.session_state.pop("export_payload", None)
             function_handler.clear_conversation()
             st.rerun()
     with col3:
@@ -542,71 +923,17 @@ def render_chat_interface(function_handler: FunctionHandler):
             chat_container = st.container()
             
             with chat_container:
-                # Display messages in reverse order (newest first for better UX)
-                for i, message in enumerate(st.session_state.messages):
-                    timestamp = message.get("timestamp", "")
-                    
-                    # Use Streamlit's native chat message components
-                    with st.chat_message(message["role"]):
-                        if message["role"] == "user":
-                            st.markdown(f"**You** _{timestamp}_")
-                            st.write(message["content"])
-                        
-                        elif message["role"] == "assistant":
-                            st.markdown(f"**🤖 Assistant** _{timestamp}_")
-                            st.write(message["content"])
-                            
-                            # Calculate the correct conversation turn index
-                            # Count how many assistant messages we've seen up to this point
-                            assistant_message_count = sum(1 for msg in st.session_state.messages[:i+1] if msg["role"] == "assistant")
-                            turn_index = assistant_message_count - 1  # Convert to 0-based index
-                            
-                            # Show tool executions if any for this turn
-                            if turn_index < len(st.session_state.conversation_turns):
-                                turn = st.session_state.conversation_turns[turn_index]
-                                if turn.tool_executions:
-                                    # Summary of tool executions
-                                    success_count = sum(1 for exec in turn.tool_executions if exec.success)
-                                    total_count = len(turn.tool_executions)
-                                    
-                                    if success_count == total_count:
-                                        status_color = "🟢"
-                                        status_text = "All successful"
-                                    elif success_count > 0:
-                                        status_color = "🟡"
-                                        status_text = f"{success_count}/{total_count} successful"
-                                    else:
-                                        status_color = "🔴"
-                                        status_text = "All failed"
-                                    
-                                    with st.expander(f"🛠️ Tool Executions ({total_count}) {status_color} {status_text}", expanded=False):
-                                        for j, exec in enumerate(turn.tool_executions):
-                                            status_icon = "✅" if exec.success else "❌"
-                                            time_str = f"({exec.execution_time:.2f}s)" if exec.execution_time else ""
-                                            
-                                            st.markdown(f"**{j+1}.** {status_icon} **{exec.tool_name}** on *{exec.server_name}* {time_str}")
-                                            
-                                            # Create columns for arguments and results
-                                            exec_col1, exec_col2 = st.columns(2)
-                                            
-                                            with exec_col1:
-                                                if exec.arguments:
-                                                    st.markdown("**📋 Arguments:**")
-                                                    st.json(exec.arguments)
-                                            
-                                            with exec_col2:
-                                                if exec.success and exec.result:
-                                                    st.markdown("**📤 Result:**")
-                                                    if isinstance(exec.result, (dict, list)):
-                                                        st.json(exec.result)
-                                                    else:
-                                                        st.code(str(exec.result))
-                                                elif exec.error:
-                                                    st.markdown("**❌ Error:**")
-                                                    st.error(exec.error)
-                                            
-                                            if j < len(turn.tool_executions) - 1:
-                                                st.divider()
+                # Only render the most recent messages; older ones are loaded on demand
+                messages = st.session_state.messages
+                start = max(0, len(messages) - st.session_state.chat_window)
+                if start > 0:
+                    if st.button(f"⬆️ Load earlier messages ({start} hidden)", key="load_earlier_messages"):
+                        st.session_state.chat_window += settings.chat_history_window
+                        _rerun_fragment()
+                
+                conversation_turns = st.session_state.conversation_turns
+                for message in messages[start:]:
+                    _render_history_message(message, conversation_turns)
             
             # Close the chat container div
             st.markdown('</div>', unsafe_allow_html=True)
@@ -620,7 +947,10 @@ def render_chat_interface(function_handler: FunctionHandler):
     
     with input_col1:
         # Use chat input for the main message
-        user_input = st.chat_input("Type your message here... Press Enter to send!")
+        user_input = st.chat_input(
+            "Type your message here... Press Enter to send!",
+            disabled=st.session_state.get("pending_turn") is not None
+        )
     
     with input_col2:
         st.write("")  # Spacer to align with chat input height
@@ -637,172 +967,22 @@ def render_chat_interface(function_handler: FunctionHandler):
             "timestamp": timestamp
         })
         
-        # Show processing status with enhanced AI status information
-        with st.status("🤖 Processing your message...", expanded=True) as status:
-            # Show initial thinking status
-            st.write("🧠 **AI is analyzing your request...**")
-            
-            try:
-                # Handle the user message with enhanced status tracking
-                turn = async_to_sync(function_handler.handle_user_message)(user_input, stream=streaming_enabled)
-                
-                # Get final AI status to show what happened during processing
-                final_status = function_handler.get_current_status()
-                recent_history = function_handler.get_status_history()
-                
-                # Show processing summary
-                st.write("✅ **Response generated successfully!**")
-                
-                # Display tool execution details if any tools were used
-                if turn.tool_executions:
-                    st.write("🛠️ **Tool Execution Summary:**")
-                    
-                    # Show overview first
-                    total_tools = len(turn.tool_executions)
-                    successful_tools = [exec for exec in turn.tool_executions if exec.success]
-                    failed_tools = [exec for exec in turn.tool_executions if not exec.success]
-                    
-                    overview_parts = []
-                    if successful_tools:
-                        overview_parts.append(f"✅ {len(successful_tools)} successful")
-                    if failed_tools:
-                        overview_parts.append(f"❌ {len(failed_tools)} failed")
-                    
-                    st.info(f"📊 **Total:** {total_tools} tool(s) executed - {', '.join(overview_parts)}")
-                    
-                    # Show individual tool executions in a simple list
-                    for i, exec in enumerate(turn.tool_executions, 1):
-                        status_icon = "✅" if exec.success else "❌"
-                        execution_time = f" ({exec.execution_time:.2f}s)" if exec.execution_time else ""
-                        
-                        # Show each tool execution
-                        st.write(f"  **{i}.** {status_icon} **{exec.tool_name}** on *{exec.server_name}*{execution_time}")
-                        
-                        # Show tool arguments in a compact format
-                        if exec.arguments:
-                            args_str = ", ".join([f"{k}={v}" for k, v in exec.arguments.items() if len(str(v)) < 50])
-                            if len(args_str) > 100:
-                                args_str = args_str[:100] + "..."
-                            st.write(f"     📋 **Args:** {args_str}")
-                        
-                        # Show result or error
-                        if exec.success and exec.result:
-                            result_str = str(exec.result)
-                            if len(result_str) > 150:
-                                result_str = result_str[:150] + "..."
-                            st.write(f"     📤 **Result:** {result_str}")
-                        elif not exec.success and exec.error:
-                            st.write(f"     ❌ **Error:** {exec.error}")
-                
-                # Show AI processing stages from status history
-                if recent_history:
-                    st.write("---")
-                    st.write("🔍 **AI Processing Stages:**")
-                    
-                    # Show last few status updates
-                    relevant_statuses = [s for s in recent_history[-10:] if s.state != "idle"]
-                    if relevant_statuses:
-                        for i, status_item in enumerate(relevant_statuses, 1):
-                            elapsed = time.time() - status_item.start_time
-                            state_icon = {
-                                "thinking": "🧠",
-                                "executing_tool": "🔧", 
-                                "responding": "💬"
-                            }.get(status_item.state, "⚡")
-                            
-                            stage_info = f"  **{i}.** {state_icon} {status_item.current_activity}"
-                            
-                            # Add tool-specific information
-                            if status_item.current_tool:
-                                stage_info += f" → **{status_item.current_tool}**"
-                            if status_item.tool_progress:
-                                stage_info += f" *({status_item.tool_progress})*"
-                            
-                            # Add progress information if available
-                            if status_item.total_tools > 0 and status_item.tools_completed >= 0:
-                                progress_info = f" [{status_item.tools_completed}/{status_item.total_tools}]"
-                                stage_info += progress_info
-                            
-                            st.write(stage_info)
-                    
-                    # Show summary of what the AI did
-                    if turn.tool_executions:
-                        st.write("**Summary:** AI analyzed your request, decided to use tools, and executed them to provide a response.")
-                    else:
-                        st.write("**Summary:** AI analyzed your request and provided a direct response without using any tools.")
-                
-                # Add assistant response
-                response_timestamp = time.strftime("%H:%M:%S")
-                st.session_state.messages.append({
-                    "role": "assistant", 
-                    "content": turn.assistant_response,
-                    "timestamp": response_timestamp
-                })
-                
-                # Store the conversation turn
-                st.session_state.conversation_turns.append(turn)
-                
-                # Show final summary
-                if turn.tool_executions:
-                    executed_tools = [exec.tool_name for exec in turn.tool_executions if exec.success]
-                    failed_tools = [exec.tool_name for exec in turn.tool_executions if not exec.success]
-                    
-                    summary_parts = []
-                    if executed_tools:
-                        summary_parts.append(f"✅ {len(executed_tools)} successful")
-                    if failed_tools:
-                        summary_parts.append(f"❌ {len(failed_tools)} failed")
-                    
-                    if summary_parts:
-                        st.info(f"🛠️ **Tools used:** {', '.join(summary_parts)}")
-                
-                status.update(label="✅ Message processed successfully!", state="complete")
-                
-            except Exception as e:
-                st.write(f"❌ **Error during processing:** {str(e)}")
-                status.update(label="❌ Error processing message", state="error")
-                
-                # Add error message to chat
-                error_timestamp = time.strftime("%H:%M:%S")
-                st.session_state.messages.append({
-                    "role": "assistant", 
-                    "content": f"I encountered an error: {str(e)}",
-                    "timestamp": error_timestamp
-                })
-        
-        # Trigger auto-scroll to bottom if enabled
-        if auto_scroll:
-            st.markdown("""
-            <script>
-                // Force scroll to chat container bottom after message processing
-                setTimeout(function() {
-                    // Find the chat messages container
-                    const chatContainer = document.getElementById('chat-messages-container');
-                    if (chatContainer) {
-                        // Scroll the chat container to show the latest message
-                        chatContainer.scrollIntoView({ 
-                            behavior: 'smooth', 
-                            block: 'end',
-                            inline: 'nearest' 
-                        });
-                    }
-                    
-                    // Also find the last chat message and scroll to it
-                    const chatMessages = document.querySelectorAll('[data-testid="chat-message"]');
-                    if (chatMessages.length > 0) {
-                        const lastMessage = chatMessages[chatMessages.length - 1];
-                        lastMessage.scrollIntoView({ 
-                            behavior: 'smooth', 
-                            block: 'nearest',
-                            inline: 'nearest' 
-                        });
-                    }
-                }, 500);
-            </script>
-            """, unsafe_allow_html=True)
-        
-        # Always rerun to update the chat
-        st.rerun()
+        # Run the message on the background loop so the page stays responsive meanwhile.
+        # Streamed chunks are appended from the loop thread and rendered by the poller.
+        stream_buffer = []
+        st.session_state.pending_stream = stream_buffer
+        st.session_state.pending_turn = AsyncLoopThread.instance().submit(
+            function_handler.handle_user_message(
+                user_input,
+                stream=streaming_enabled,
+                on_token=stream_buffer.append if streaming_enabled else None
+            )
+        )
+        _rerun_fragment()
+    
+    # Poll the in-flight message without rerunning the rest of the page
+    if st.session_state.get("pending_turn") is not None:
+        st.fragment(_render_pending_turn, run_every=0.2)(function_handler)
     
     # Show helpful tips when no messages
     if len(st.session_state.messages) == 0:
@@ -833,52 +1013,11 @@ def render_chat_interface(function_handler: FunctionHandler):
     # Add scroll anchor at the bottom for auto-scroll functionality
     st.markdown('<div id="chat-bottom-anchor"></div>', unsafe_allow_html=True)
     
-    # Enhanced auto-scroll script for better reliability
-    if auto_scroll and len(st.session_state.messages) > 0:
-        st.markdown("""
-        <script>
-            // Multiple scroll strategies targeting the chat container
-            function scrollToChatBottom() {
-                // Strategy 1: Scroll to the chat messages container
-                const chatContainer = document.getElementById('chat-messages-container');
-                if (chatContainer) {
-                    chatContainer.scrollIntoView({ 
-                        behavior: 'smooth', 
-                        block: 'end',
-                        inline: 'nearest' 
-                    });
-                }
-                
-                // Strategy 2: Scroll to the last chat message
-                setTimeout(() => {
-                    const chatMessages = document.querySelectorAll('[data-testid="chat-message"]');
-                    if (chatMessages.length > 0) {
-                        const lastMessage = chatMessages[chatMessages.length - 1];
-                        lastMessage.scrollIntoView({ 
-                            behavior: 'smooth', 
-                            block: 'center',
-                            inline: 'nearest' 
-                        });
-                    }
-                }, 200);
-                
-                // Strategy 3: Scroll to the bottom anchor for final positioning
-                setTimeout(() => {
-                    const anchor = document.getElementById('chat-bottom-anchor');
-                    if (anchor) {
-                        anchor.scrollIntoView({ 
-                            behavior: 'smooth', 
-                            block: 'start',
-                            inline: 'nearest' 
-                        });
-                    }
-                }, 400);
-            }
-            
-            // Execute scroll
-            scrollToChatBottom();
-        </script>
-        """, unsafe_allow_html=True)
+    # Scroll only when a message was appended since the last run, not on every rerun
+    message_count = len(st.session_state.messages)
+    if auto_scroll and message_count > st.session_state.get("scrolled_message_count", 0):
+        components.html(_SCROLL_HTML, height=0)
+    st.session_state.scrolled_message_count = message_count
 
 
 def render_analytics_tab(function_handler: FunctionHandler, tool_executor: MCPToolExecutor):
@@ -905,12 +1044,13 @@ def render_analytics_tab(function_handler: FunctionHandler, tool_executor: MCPTo
     # Tools used
     if exec_summary["tools_used"]:
         st.subheader("Tools Used")
-        tools_df = pd.DataFrame({
-            "Tool": exec_summary["tools_used"],
-            "Server": [exec.server_name for exec in tool_executor.get_recent_executions(100) 
-                      if exec.tool_name in exec_summary["tools_used"]][:len(exec_summary["tools_used"])]
-        })
-        st.dataframe(tools_df, use_container_width=True)
+        # The executor keeps the tool -> server map up to date as tools run
+        tools_used = exec_summary["tools_used"]
+        tool_to_server = tool_executor.get_tool_server_map()
+        
+        # st.dataframe takes a list of row dicts directly, so no DataFrame is built here
+        tool_rows = [{"Tool": tool, "Server": tool_to_server.get(tool, "")} for tool in tools_used]
+        st.dataframe(tool_rows, use_container_width=True)
     
     # Recent executions
     recent_executions = tool_executor.get_recent_executions(10)
@@ -918,34 +1058,58 @@ def render_analytics_tab(function_handler: FunctionHandler, tool_executor: MCPTo
         st.subheader("Recent Tool Executions")
         
         for exec in recent_executions:
-            status_color = "green" if exec.success else "red"
-            time_str = f"({exec.execution_time:.2f}s)" if exec.execution_time else ""
+            # Read each attribute once per execution
+            success, execution_time, error = exec.success, exec.execution_time, exec.error
+            time_str = f"({execution_time:.2f}s)" if execution_time else ""
             
-            with st.expander(f"{'✅' if exec.success else '❌'} {exec.tool_name} on {exec.server_name} {time_str}"):
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write("**Arguments:**")
-                    st.json(exec.arguments)
-                with col2:
-                    if exec.success and exec.result:
-                        st.write("**Result:**")
-                        if isinstance(exec.result, (dict, list)):
-                            st.json(exec.result)
-                        else:
-                            st.code(str(exec.result))
-                    elif exec.error:
-                        st.write("**Error:**")
-                        st.error(exec.error)
+            with st.expander(f"{'✅' if success else '❌'} {exec.tool_name} on {exec.server_name} {time_str}"):
+                # Arguments and result/error go out as one markdown element
+                parts = [f"**Arguments:**\n```json\n{exec.rendered_arguments()}\n```"]
+                if success and exec.result:
+                    kind, rendered = exec.rendered_result()
+                    parts.append(f"**Result:**\n```{'json' if kind == 'json' else ''}\n{rendered}\n```")
+                elif error:
+                    parts.append(f"**Error:** {error}")
+                st.markdown("\n\n".join(parts))
     
-    # Export conversation
+    # Export conversation. Only the selected format is built, once per conversation state,
+    # and the export is dismissed as soon as the conversation changes.
+    turns = function_handler.conversation_turns
+    export_key = (conv_summary["total_turns"], turns[-1].timestamp if turns else None)
     if st.button("📥 Export Conversation"):
-        conversation_data = function_handler.export_conversation()
-        st.download_button(
-            label="Download JSON",
-            data=json.dumps(conversation_data, indent=2),
-            file_name=f"mcp_conversation_{int(time.time())}.json",
-            mime="application/json"
-        )
+        st.session_state.export_key = export_key
+    
+    if st.session_state.get("export_key") != export_key:
+        st.session_state.pop("export_key", None)
+        st.session_state.pop("export_payload", None)
+        return
+    
+    export_format = st.radio("Format", ["JSON", "JSONL"], horizontal=True, key="export_format")
+    payload = st.session_state.get("export_payload")
+    if payload is None or payload[:2] != (export_key, export_format):
+        if export_format == "JSON":
+            data = json_dumps(function_handler.export_conversation(), indent=True)
+        else:
+            # download_button needs the whole payload; the iterator reuses already-serialized turn lines
+            data = "".join(function_handler.export_conversation_iter())
+        payload = (export_key, export_format, int(time.time()), data)
+        st.session_state.export_payload = payload
+    
+    _, _, export_time, data = payload
+    extension, mime = ("json", "application/json") if export_format == "JSON" else ("jsonl", "application/x-ndjson")
+    st.download_button(
+        label=f"Download {export_format}",
+        data=data,
+        file_name=f"mcp_conversation_{export_time}.{extension}",
+        mime=mime
+    )
+
+
+def _wait_for_server_init():
+    """Show a waiting status until server initialization finishes, then rerun the page."""
+    if "initializing_servers" not in st.session_state:
+        st.rerun()
+    st.status("🔄 Initializing MCP servers, please wait...", state="running")
 
 
 def main():
@@ -965,14 +1129,15 @@ def main():
         st.error("Failed to initialize application components. Please check your configuration.")
         return
     
-    # Test OpenAI connection
-    with st.spinner("Testing OpenAI connection..."):
-        success, message = async_to_sync(openai_client.test_connection)()
-        if success:
-            st.success("✅ OpenAI connection successful")
-        else:
-            st.error(f"❌ OpenAI connection failed: {message}")
-            st.stop()
+    # Test OpenAI connection once per session; failures are retried on the next rerun
+    if "openai_connection_ok" not in st.session_state:
+        with st.spinner("Testing OpenAI connection..."):
+            success, message = run_coro(openai_client.test_connection())
+            if not success:
+                st.error(f"❌ OpenAI connection failed: {message}")
+                st.stop()
+            st.session_state.openai_connection_ok = True
+    st.success("✅ OpenAI connection successful")
     
     # Auto-initialize and connect MCP servers (only once per session)
     # Use a lock mechanism to prevent concurrent initialization
@@ -984,14 +1149,15 @@ def main():
                 try:
                     # Initialize server manager if not done
                     if not server_manager._initialized:
-                        init_success = async_to_sync(server_manager.initialize)()
+                        init_success = run_coro(server_manager.initialize())
                         if init_success:
                             logger.info("MCP server manager initialized")
                         else:
                             st.warning("⚠️ Failed to initialize MCP server manager")
                     
                     # Auto-connect to all enabled servers with improved startup sequence
-                    results = async_to_sync(server_manager.startup_connect_servers)()
+                    results = run_coro(server_manager.startup_connect_servers())
+                    _bump_server_epoch()
                     
                     # Store results in session state
                     st.session_state.servers_initialized = True
@@ -1021,21 +1187,26 @@ def main():
                         del st.session_state.initializing_servers
                         
         else:
-            # If already initializing, show a waiting message
-            st.info("🔄 Initializing MCP servers, please wait...")
-            time.sleep(0.5)
-            st.rerun()
+            # If already initializing, poll from a timed fragment instead of blocking the script
+            st.fragment(_wait_for_server_init, run_every=0.5)()
+            st.stop()
     
     # Render server panel in sidebar
-    render_server_panel(server_manager)
+    render_server_panel(server_manager, openai_client)
     
-    # Main content tabs
-    tab1, tab2 = st.tabs(["💬 Chat", "📊 Analytics"])
+    # Main content views. st.tabs runs every tab's body on each rerun, so a radio
+    # picks the view and only that branch executes.
+    view = st.radio(
+        "View",
+        ["💬 Chat", "📊 Analytics"],
+        horizontal=True,
+        key="main_view",
+        label_visibility="collapsed"
+    )
     
-    with tab1:
+    if view == "💬 Chat":
         render_chat_interface(function_handler)
-    
-    with tab2:
+    else:
         render_analytics_tab(function_handler, tool_executor)
     
     # Footer
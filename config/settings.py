@@ -1,7 +1,11 @@
 """
 Configuration settings for the MCP Streamlit Chatbot.
 """
+import copy
+import json
 import os
+import threading
+from functools import lru_cache
 from typing import Dict, List, Optional
 try:
     from pydantic_settings import BaseSettings
@@ -21,15 +25,34 @@ class Settings(BaseSettings):
     openai_model: str = Field(default="gpt-5", env="OPENAI_MODEL")
     openai_max_tokens: int = Field(default=1000, env="OPENAI_MAX_TOKENS")
     openai_temperature: float = Field(default=0.7, env="OPENAI_TEMPERATURE")
+    openai_max_context_tokens: int = Field(default=120000, env="OPENAI_MAX_CONTEXT_TOKENS")
+    prompt_cache_control: bool = Field(default=False, env="PROMPT_CACHE_CONTROL")
+    prompt_cache_key: bool = Field(default=True, env="PROMPT_CACHE_KEY")
+    response_cache_size: int = Field(default=512, env="RESPONSE_CACHE_SIZE")
+    response_cache_nondeterministic: bool = Field(default=False, env="RESPONSE_CACHE_NONDETERMINISTIC")
+    openai_embedding_model: str = Field(default="text-embedding-3-small", env="OPENAI_EMBEDDING_MODEL")
+    
+    # Semantic response cache
+    semantic_cache_enabled: bool = Field(default=False, env="SEMANTIC_CACHE_ENABLED")
+    semantic_cache_threshold: float = Field(default=0.92, env="SEMANTIC_CACHE_THRESHOLD")
+    semantic_cache_size: int = Field(default=512, env="SEMANTIC_CACHE_SIZE")
+    
+    # Conversation history summarization
+    history_summary_threshold: int = Field(default=6000, env="HISTORY_SUMMARY_THRESHOLD")
+    openai_summary_model: str = Field(default="gpt-4o-mini", env="OPENAI_SUMMARY_MODEL")
     
     # MCP Configuration
     mcp_timeout: int = Field(default=30, env="MCP_TIMEOUT")
+    mcp_tool_timeout: int = Field(default=300, env="MCP_TOOL_TIMEOUT")
     mcp_retry_attempts: int = Field(default=3, env="MCP_RETRY_ATTEMPTS")
     mcp_servers_config_path: str = Field(default="config/mcp_servers.json", env="MCP_SERVERS_CONFIG")
+    tool_response_max_chars: int = Field(default=8192, env="TOOL_RESPONSE_MAX_CHARS")
+    max_concurrent_tools: int = Field(default=8, env="MAX_CONCURRENT_TOOLS")
     
     # Streamlit Configuration
     app_title: str = Field(default="MCP Server Tester", env="APP_TITLE")
     app_icon: str = Field(default="🤖", env="APP_ICON")
+    chat_history_window: int = Field(default=50, env="CHAT_HISTORY_WINDOW")
     debug_mode: bool = Field(default=False, env="DEBUG_MODE")
     
     # Logging
@@ -78,28 +101,49 @@ DEFAULT_MCP_SERVERS = [
 ]
 
 
+# Serializes creation of the default config file across Streamlit sessions
+_config_write_lock = threading.Lock()
+
+
+@lru_cache(maxsize=4)
+def _read_mcp_servers_config(path: str, mtime_ns: int, size: int) -> List[Dict]:
+    """Parse the config file; the stat fields in the key make a changed file miss the cache."""
+    with open(path, 'r') as f:
+        servers = json.load(f)
+    if not isinstance(servers, list):
+        raise ValueError(f"{path} must contain a JSON list of servers, got {type(servers).__name__}")
+    return servers
+
+
 def get_mcp_servers_config() -> List[Dict]:
-    """Get MCP servers configuration from file or defaults."""
-    import json
+    """Get MCP servers configuration from file or defaults.
     
+    The parsed file is cached until its mtime or size changes. Callers get their own
+    copy, since they edit and save the returned list.
+    """
+    path = settings.mcp_servers_config_path
     try:
-        with open(settings.mcp_servers_config_path, 'r') as f:
-            return json.load(f)
+        stat = os.stat(path)
+        return copy.deepcopy(_read_mcp_servers_config(path, stat.st_mtime_ns, stat.st_size))
     except FileNotFoundError:
-        # Create default config file
-        os.makedirs(os.path.dirname(settings.mcp_servers_config_path), exist_ok=True)
-        with open(settings.mcp_servers_config_path, 'w') as f:
-            json.dump(DEFAULT_MCP_SERVERS, f, indent=2)
-        return DEFAULT_MCP_SERVERS
+        # Create default config file; exclusive create so concurrent sessions don't clobber each other
+        with _config_write_lock:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'x') as f:
+                    json.dump(DEFAULT_MCP_SERVERS, f, indent=2)
+            except FileExistsError:
+                pass
+            except Exception as e:
+                print(f"Error creating MCP servers config: {e}")
+        return copy.deepcopy(DEFAULT_MCP_SERVERS)
     except Exception as e:
         print(f"Error loading MCP servers config: {e}")
-        return DEFAULT_MCP_SERVERS
+        return copy.deepcopy(DEFAULT_MCP_SERVERS)
 
 
 def save_mcp_servers_config(servers: List[Dict]) -> bool:
     """Save MCP servers configuration to file."""
-    import json
-    
     try:
         os.makedirs(os.path.dirname(settings.mcp_servers_config_path), exist_ok=True)
         with open(settings.mcp_servers_config_path, 'w') as f:
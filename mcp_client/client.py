@@ -11,7 +11,7 @@ from dataclasses import dataclass, field
 from enum import Enum
 
 from utils.logger import logger
-from utils.helpers import Timer
+from utils.helpers import Timer, json_loads
 from config.settings import settings
 
 
@@ -60,6 +60,8 @@ class MCPClient:
     def __init__(self):
         self.servers: Dict[str, MCPServer] = {}
         self._lock = asyncio.Lock()
+        self._io_locks: Dict[str, asyncio.Lock] = {}  # One in-flight request per server pipe
+        self.tools_version = 0  # Bumped whenever the set of available tools may have changed
     
     async def add_server(self, server_config: Dict[str, Any]) -> bool:
         """Add a new MCP server configuration."""
@@ -105,6 +107,7 @@ class MCPClient:
         
         try:
             server.status = ServerStatus.CONNECTING
+            self.tools_version += 1
             server.last_error = None
             # Clear previous error details
             server.stderr_output = None
@@ -145,6 +148,7 @@ class MCPClient:
                 await self._discover_tools(server)
             
             server.status = ServerStatus.CONNECTED
+            self.tools_version += 1
             server.connection_time = timer.elapsed
             logger.info(f"Connected to MCP server {server_name} in {timer.elapsed:.2f}s")
             return True
@@ -171,6 +175,7 @@ class MCPClient:
             
             server.status = ServerStatus.DISCONNECTED
             server.tools = []
+            self.tools_version += 1
             server.connection_time = None
             logger.info(f"Disconnected from MCP server {server_name}")
             return True
@@ -231,6 +236,7 @@ class MCPClient:
                     server_name=server.name
                 )
                 server.tools.append(tool)
+            self.tools_version += 1
             
             logger.info(f"Discovered {len(server.tools)} tools on server {server.name}")
     
@@ -243,19 +249,66 @@ class MCPClient:
         if server.process.poll() is not None:
             raise Exception(f"Server process has exited with code {server.process.returncode}")
         
+        # Tool calls may legitimately run long, so they get their own bound and a timeout
+        # doesn't take the server down; handshake requests use the connection timeout
+        is_tool_call = request.get("method") == "tools/call"
+        timeout = settings.mcp_tool_timeout if is_tool_call else settings.mcp_timeout
+        
+        # Pipe I/O blocks, so run it in a worker thread to keep the event loop responsive.
+        # The lock keeps each request paired with its response on the shared stdio pipe.
+        io_lock = self._io_locks.get(server.name)
+        if io_lock is None:
+            io_lock = self._io_locks[server.name] = asyncio.Lock()
+        try:
+            await asyncio.wait_for(io_lock.acquire(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"Server {server.name} is still busy with an earlier request")
+        
+        def release(future: asyncio.Future) -> None:
+            io_lock.release()
+            if not future.cancelled():
+                future.exception()  # An abandoned request's error is not worth a "never retrieved" warning
+        
+        # The lock is freed only once the pipe read finishes, so a reply that arrives after its
+        # caller gave up is read and dropped instead of being paired with the next request
+        reply = asyncio.ensure_future(asyncio.to_thread(self._send_request_blocking, server, request))
+        reply.add_done_callback(release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(reply), timeout=timeout)
+        except asyncio.TimeoutError:
+            if is_tool_call:
+                raise Exception(f"Tool call on {server.name} did not finish within {timeout}s")
+            
+            # A stuck handshake means a hung server; killing the process closes the pipe and
+            # unblocks the worker thread
+            process = server.process
+            if process and process.poll() is None:
+                process.kill()
+            server.status = ServerStatus.ERROR
+            server.last_error = f"No response within {timeout}s"
+            server.error_timestamp = time.time()
+            self.tools_version += 1
+            raise Exception(f"Server {server.name} did not respond within {timeout}s")
+    
+    def _send_request_blocking(self, server: MCPServer, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Write a request to the server pipe and read its response (blocking)."""
+        process = server.process  # May be cleared by a concurrent disconnect
+        if not process:
+            raise Exception("Server process not available")
+        
         try:
             # Send request
             request_str = json.dumps(request) + "\n"
-            server.process.stdin.write(request_str)
-            server.process.stdin.flush()
+            process.stdin.write(request_str)
+            process.stdin.flush()
             
             # Read response (if expecting one)
             if "id" in request:
-                # Set a timeout for reading response
-                response_str = server.process.stdout.readline()
+                # Blocks until a line arrives; _send_request bounds how long the caller waits
+                response_str = process.stdout.readline()
                 if response_str:
                     try:
-                        return json.loads(response_str.strip())
+                        return json_loads(response_str.strip())
                     except json.JSONDecodeError as e:
                         logger.error(f"Failed to parse response from {server.name}: {e}")
                         logger.error(f"Raw response: {response_str[:200]}...")
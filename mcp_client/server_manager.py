@@ -2,6 +2,7 @@
 MCP Server Manager for handling server configurations and lifecycle.
 """
 import asyncio
+import datetime
 from typing import Dict, List, Optional, Any
 from dataclasses import asdict
 
@@ -53,27 +54,20 @@ class MCPServerManager:
             if server.enabled:
                 if server.status != ServerStatus.CONNECTED:
                     servers_to_connect.append(server_name)
-                results[server_name] = True  # Will be updated after connection attempt
+                results[server_name] = True  # Overwritten below for servers that need connecting
             else:
                 if server.status == ServerStatus.CONNECTED:
                     servers_to_disconnect.append(server_name)
                 results[server_name] = False
         
         # Disconnect servers that should be disabled (gracefully)
-        for server_name in servers_to_disconnect:
-            await self.client.disconnect_server(server_name)
+        await asyncio.gather(
+            *(self.client.disconnect_server(name) for name in servers_to_disconnect),
+            return_exceptions=True
+        )
         
-        # Connect enabled servers one by one with delay to prevent overwhelming
-        for i, server_name in enumerate(servers_to_connect):
-            if i > 0:
-                # Add small delay between connections to prevent overwhelming the system
-                await asyncio.sleep(0.1)
-            
-            success = await self.client.connect_server(server_name)
-            results[server_name] = success
-            
-            if not success:
-                logger.warning(f"Failed to connect to server {server_name} during refresh")
+        # Connect enabled servers concurrently so the refresh takes as long as the slowest server
+        results.update(await self.connect_many(servers_to_connect))
         
         return results
     
@@ -103,16 +97,10 @@ class MCPServerManager:
             
             logger.info(f"Starting connection to {len(enabled_servers)} enabled servers...")
             
-            # Connect to servers one by one with spacing
-            for i, (server_name, server) in enumerate(enabled_servers):
-                if i > 0:
-                    # Add delay between connections to prevent overwhelming
-                    await asyncio.sleep(0.3)  # Increased delay
-                
-                logger.info(f"Connecting to server {i+1}/{len(enabled_servers)}: {server_name}")
-                success = await self.connect_server(server_name)
-                results[server_name] = success
-                
+            # Connect to all enabled servers concurrently
+            results.update(await self.connect_many([name for name, _ in enabled_servers]))
+            
+            for server_name, success in results.items():
                 if success:
                     logger.info(f"✅ Successfully connected to {server_name}")
                 else:
@@ -153,6 +141,25 @@ class MCPServerManager:
         logger.error(f"Failed to connect to {server_name} after {max_retries + 1} attempts")
         return False
     
+    async def connect_many(self, server_names: List[str]) -> Dict[str, bool]:
+        """Connect to several servers concurrently, each with the usual retry logic.
+        
+        The batch takes as long as the slowest server rather than the sum of all of them.
+        A server whose connect raises is reported as failed without affecting the others.
+        """
+        outcomes = await asyncio.gather(
+            *(self.connect_server(name) for name in server_names),
+            return_exceptions=True
+        )
+        
+        results = {}
+        for server_name, outcome in zip(server_names, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error(f"Error connecting to server {server_name}: {outcome}")
+                outcome = False
+            results[server_name] = outcome
+        return results
+    
     async def disconnect_server(self, server_name: str) -> bool:
         """Disconnect from a specific server."""
         return await self.client.disconnect_server(server_name)
@@ -332,8 +339,6 @@ class MCPServerManager:
         if server.status != ServerStatus.ERROR and not server.last_error:
             return None
         
-        import datetime
-        
         error_details = {
             "server_name": server.name,
             "status": server.status.value,
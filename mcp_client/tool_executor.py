@@ -3,14 +3,14 @@ Tool executor for handling MCP tool execution with OpenAI integration.
 """
 import json
 from typing import Any, Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from mcp_client.server_manager import MCPServerManager
 from utils.logger import logger
-from utils.helpers import format_tool_call, format_tool_result, Timer
+from utils.helpers import format_tool_call, format_tool_result, json_dumps, json_loads, Timer
 
 
-@dataclass
+@dataclass(slots=True)
 class ToolExecution:
     """Represents a tool execution result."""
     tool_name: str
@@ -20,6 +20,23 @@ class ToolExecution:
     result: Any = None
     error: Optional[str] = None
     execution_time: Optional[float] = None
+    _rendered: Optional[Tuple[str, str]] = field(default=None, init=False, repr=False, compare=False)
+    _rendered_arguments: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    
+    def rendered_arguments(self) -> str:
+        """Return the arguments pretty-printed as JSON, computed once."""
+        if self._rendered_arguments is None:
+            self._rendered_arguments = json_dumps(self.arguments, indent=True)
+        return self._rendered_arguments
+    
+    def rendered_result(self) -> Tuple[str, str]:
+        """Return the result as ("json", text) or ("code", text) for display, computed once."""
+        if self._rendered is None:
+            if isinstance(self.result, (dict, list)):
+                self._rendered = ("json", json_dumps(self.result, indent=True))
+            else:
+                self._rendered = ("code", str(self.result))
+        return self._rendered
 
 
 class MCPToolExecutor:
@@ -28,6 +45,11 @@ class MCPToolExecutor:
     def __init__(self, server_manager: MCPServerManager):
         self.server_manager = server_manager
         self.execution_history: List[ToolExecution] = []
+        self._summary = self._empty_summary()
+        
+        # Function definitions are rebuilt only when the tools version changes
+        self._function_definitions: Optional[List[Dict[str, Any]]] = None
+        self._function_definitions_version: Optional[int] = None
     
     async def execute_tool_by_name(self, tool_name: str, arguments: Dict[str, Any]) -> ToolExecution:
         """Execute a tool by name, finding the appropriate server."""
@@ -49,7 +71,7 @@ class MCPToolExecutor:
                 success=False,
                 error=f"Tool '{tool_name}' not found on any connected server"
             )
-            self.execution_history.append(execution)
+            self._record_execution(execution)
             return execution
         
         return await self.execute_tool(server_name, tool_name, arguments)
@@ -71,7 +93,7 @@ class MCPToolExecutor:
             execution_time=timer.elapsed
         )
         
-        self.execution_history.append(execution)
+        self._record_execution(execution)
         
         if execution.success:
             logger.info(f"Tool {tool_name} executed successfully in {timer.elapsed:.2f}s")
@@ -80,8 +102,22 @@ class MCPToolExecutor:
         
         return execution
     
+    @property
+    def tools_version(self) -> int:
+        """Version counter that changes whenever the available tools may have changed."""
+        return self.server_manager.client.tools_version
+    
     def get_openai_function_definitions(self) -> List[Dict[str, Any]]:
-        """Get OpenAI function definitions for all available tools."""
+        """
+        Get OpenAI function definitions for all available tools.
+        
+        The same list object is returned until the tool set changes, so callers
+        can cache work derived from it by identity.
+        """
+        version = self.tools_version
+        if self._function_definitions is not None and self._function_definitions_version == version:
+            return self._function_definitions
+        
         functions = []
         
         tools_by_server = self.server_manager.get_available_tools()
@@ -109,14 +145,18 @@ class MCPToolExecutor:
                 
                 functions.append(function_def)
         
+        self._function_definitions = functions
+        self._function_definitions_version = version
+        logger.debug(f"Rebuilt {len(functions)} OpenAI function definitions (tools version {version})")
+        
         return functions
     
     async def execute_function_call(self, function_name: str, function_args: str) -> Tuple[bool, str]:
         """Execute a function call from OpenAI and return formatted result."""
         try:
             # Parse arguments
-            if isinstance(function_args, str):
-                arguments = json.loads(function_args)
+            if isinstance(function_args, (str, bytes)):
+                arguments = json_loads(function_args)
             else:
                 arguments = function_args
             
@@ -140,36 +180,49 @@ class MCPToolExecutor:
             logger.error(error_msg)
             return False, format_tool_result(None, error_msg)
     
+    @staticmethod
+    def _empty_summary() -> Dict[str, Any]:
+        """Create zeroed running execution aggregates."""
+        return {
+            "successful_executions": 0,
+            "tool_servers": {},
+            "servers_used": set(),
+            "total_time": 0.0,
+            "timed_executions": 0
+        }
+    
+    def _record_execution(self, execution: ToolExecution) -> None:
+        """Append an execution and fold it into the running aggregates."""
+        self.execution_history.append(execution)
+        
+        summary = self._summary
+        if execution.success:
+            summary["successful_executions"] += 1
+        summary["tool_servers"][execution.tool_name] = execution.server_name
+        summary["servers_used"].add(execution.server_name)
+        if execution.execution_time:
+            summary["total_time"] += execution.execution_time
+            summary["timed_executions"] += 1
+    
     def get_execution_summary(self) -> Dict[str, Any]:
         """Get summary of tool executions."""
-        if not self.execution_history:
-            return {
-                "total_executions": 0,
-                "successful_executions": 0,
-                "failed_executions": 0,
-                "tools_used": [],
-                "servers_used": [],
-                "average_execution_time": 0
-            }
-        
-        successful = [e for e in self.execution_history if e.success]
-        failed = [e for e in self.execution_history if not e.success]
-        
-        tools_used = list(set(e.tool_name for e in self.execution_history))
-        servers_used = list(set(e.server_name for e in self.execution_history))
-        
-        execution_times = [e.execution_time for e in self.execution_history if e.execution_time]
-        avg_time = sum(execution_times) / len(execution_times) if execution_times else 0
+        summary = self._summary
+        total_executions = len(self.execution_history)
+        timed_executions = summary["timed_executions"]
         
         return {
-            "total_executions": len(self.execution_history),
-            "successful_executions": len(successful),
-            "failed_executions": len(failed),
-            "tools_used": tools_used,
-            "servers_used": servers_used,
-            "average_execution_time": avg_time
+            "total_executions": total_executions,
+            "successful_executions": summary["successful_executions"],
+            "failed_executions": total_executions - summary["successful_executions"],
+            "tools_used": list(summary["tool_servers"]),
+            "servers_used": list(summary["servers_used"]),
+            "average_execution_time": summary["total_time"] / timed_executions if timed_executions else 0
         }
     
+    def get_tool_server_map(self) -> Dict[str, str]:
+        """Map each tool used so far to the server it most recently ran on."""
+        return dict(self._summary["tool_servers"])
+    
     def get_recent_executions(self, limit: int = 10) -> List[ToolExecution]:
         """Get recent tool executions."""
         return self.execution_history[-limit:] if self.execution_history else []
@@ -177,6 +230,7 @@ class MCPToolExecutor:
     def clear_execution_history(self) -> None:
         """Clear the execution history."""
         self.execution_history = []
+        self._summary = self._empty_summary()
         logger.info("Cleared tool execution history")
     
     def format_execution_for_display(self, execution: ToolExecution) -> str:
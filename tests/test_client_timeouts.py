@@ -0,0 +1,75 @@
+"""Timeout handling for MCP requests against a fake stdio server."""
+
+import sys
+import unittest
+
+from config.settings import settings
+from mcp_client.client import MCPClient, ServerStatus
+
+# Answers the handshake at once and replies to tools/call after TOOL_DELAY seconds
+FAKE_SERVER = """
+import json, sys, time
+
+for line in sys.stdin:
+    request = json.loads(line)
+    if "id" not in request:
+        continue
+    method = request["method"]
+    if method == "initialize":
+        result = {"protocolVersion": "2024-11-05", "capabilities": {}, "serverInfo": {"name": "fake"}}
+    elif method == "tools/list":
+        result = {"tools": [{"name": "slow", "description": "Sleeps", "inputSchema": {"type": "object"}}]}
+    else:
+        time.sleep(float(sys.argv[1]))
+        result = {"content": [{"type": "text", "text": "done"}]}
+    print(json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": result}), flush=True)
+"""
+
+TOOL_DELAY = 2.0
+
+
+class ToolCallTimeoutTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._saved = (settings.mcp_timeout, settings.mcp_tool_timeout)
+        settings.mcp_timeout = 1  # Shorter than the tool's delay
+        
+        self.client = MCPClient()
+        await self.client.add_server({
+            "name": "fake",
+            "command": sys.executable,
+            "args": ["-c", FAKE_SERVER, str(TOOL_DELAY)],
+            "description": "Fake server with a slow tool",
+        })
+        self.assertTrue(await self.client.connect_server("fake"))
+    
+    async def asyncTearDown(self):
+        await self.client.disconnect_all()
+        settings.mcp_timeout, settings.mcp_tool_timeout = self._saved
+    
+    async def test_slow_tool_outlives_handshake_timeout(self):
+        settings.mcp_tool_timeout = 10
+        
+        success, result, error = await self.client.execute_tool("fake", "slow", {})
+        
+        self.assertTrue(success, error)
+        self.assertEqual(result["content"][0]["text"], "done")
+        self.assertEqual(self.client.get_server_status("fake"), ServerStatus.CONNECTED)
+    
+    async def test_tool_timeout_keeps_server_connected(self):
+        settings.mcp_tool_timeout = 1
+        
+        success, _, error = await self.client.execute_tool("fake", "slow", {})
+        
+        self.assertFalse(success)
+        self.assertIn("did not finish", error)
+        self.assertEqual(self.client.get_server_status("fake"), ServerStatus.CONNECTED)
+        
+        # The late reply is drained before the next call, so responses stay paired
+        settings.mcp_tool_timeout = 10
+        success, result, error = await self.client.execute_tool("fake", "slow", {})
+        self.assertTrue(success, error)
+        self.assertEqual(result["content"][0]["text"], "done")
+
+
+if __name__ == "__main__":
+    unittest.main()
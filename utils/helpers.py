@@ -3,9 +3,19 @@ Utility helper functions for the MCP Streamlit Chatbot.
 """
 import json
 import asyncio
+import threading
 import time
-from typing import Any, Dict, List, Optional
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Union
 from functools import wraps
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 
 def async_to_sync(async_func):
@@ -23,9 +33,64 @@ def async_to_sync(async_func):
     return wrapper
 
 
+class AsyncLoopThread(threading.Thread):
+    """Daemon thread that owns one persistent event loop for synchronous callers.
+    
+    Reusing a single loop keeps loop-bound state (locks, HTTP connection pools,
+    in-memory caches) alive across calls instead of rebuilding it per call.
+    """
+    
+    _instance: Optional["AsyncLoopThread"] = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self):
+        super().__init__(name="async-loop", daemon=True)
+        # uvloop is only used for this loop; Streamlit's own server loop is left alone
+        self.loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+    
+    def run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+    
+    @classmethod
+    def instance(cls) -> "AsyncLoopThread":
+        """Get the process-wide loop thread, starting it on first use."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                cls._instance.start()
+            return cls._instance
+    
+    def submit(self, coro) -> Future:
+        """Schedule a coroutine on the loop and return a concurrent.futures.Future for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+
+def json_dumps(obj: Any, indent: bool = False) -> str:
+    """Serialize to JSON, using orjson when it is installed."""
+    if orjson is not None:
+        try:
+            option = orjson.OPT_INDENT_2 if indent else 0
+            return orjson.dumps(obj, option=option | orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            # Types orjson can't handle (e.g. very large ints) fall back to the stdlib
+            pass
+    
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """Parse JSON, using orjson when it is installed (its errors subclass json.JSONDecodeError)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 def format_tool_call(tool_name: str, arguments: Dict[str, Any]) -> str:
     """Format a tool call for display."""
-    args_str = json.dumps(arguments, indent=2)
+    args_str = json_dumps(arguments, indent=True)
     return f"**Tool Call:** `{tool_name}`\n```json\n{args_str}\n```"
 
 
@@ -35,7 +100,7 @@ def format_tool_result(result: Any, error: Optional[str] = None) -> str:
         return f"**Error:** {error}"
     
     if isinstance(result, (dict, list)):
-        result_str = json.dumps(result, indent=2)
+        result_str = json_dumps(result, indent=True)
         return f"**Result:**\n```json\n{result_str}\n```"
     else:
         return f"**Result:** {str(result)}"
@@ -51,7 +116,7 @@ def truncate_text(text: str, max_length: int = 500) -> str:
 def validate_json(json_str: str) -> tuple[bool, Optional[Dict]]:
     """Validate JSON string and return parsed result."""
     try:
-        parsed = json.loads(json_str)
+        parsed = json_loads(json_str)
         return True, parsed
     except json.JSONDecodeError as e:
         return False, {"error": str(e)}